@@ -0,0 +1,128 @@
+import argparse
+import os
+from datetime import date, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, Booking, BookingArchive, UserBookingStats, BOOKING_HISTORY_COLUMNS, create_tables
+
+ARCHIVE_HORIZON_DAYS = int(os.getenv("ARCHIVE_HORIZON_DAYS", 365))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", 1000))
+ARCHIVED_STATUSES = ("Completed", "Cancelled")
+
+# Arrival date as a sortable YYYYMMDD integer
+ARRIVAL_KEY = Booking.arrival_year * 10000 + Booking.arrival_month * 100 + Booking.arrival_date
+
+def _status_counts(status_column):
+    """Count, cancellations and completions of a set of bookings"""
+    return (
+        func.count(),
+        func.coalesce(func.sum(case((status_column == "Cancelled", 1), else_=0)), 0),
+        func.coalesce(func.sum(case((status_column == "Completed", 1), else_=0)), 0),
+    )
+
+def user_booking_history(db: Session, user_id: int) -> Tuple[int, int, int]:
+    """Return (bookings, cancellations, completions) of a user across live and archived bookings"""
+    total, cancelled, completed = db.execute(
+        select(*_status_counts(Booking.status)).where(Booking.user_id == user_id)
+    ).one()
+    archived = db.get(UserBookingStats, user_id)
+    if archived is not None:
+        total += archived.archived_bookings
+        cancelled += archived.archived_cancellations
+        completed += archived.archived_completions
+    return total, cancelled, completed
+
+def _add_archived_counts(db: Session, booking_ids: list):
+    """Fold the bookings about to be archived into the per-user counters"""
+    rows = db.execute(
+        select(Booking.user_id, *_status_counts(Booking.status))
+        .where(Booking.id.in_(booking_ids), Booking.user_id.isnot(None))
+        .group_by(Booking.user_id)
+    ).all()
+    existing = {
+        stats.user_id: stats
+        for stats in db.query(UserBookingStats).filter(UserBookingStats.user_id.in_([row[0] for row in rows]))
+    }
+    for user_id, total, cancelled, completed in rows:
+        stats = existing.get(user_id)
+        if stats is None:
+            stats = UserBookingStats(user_id=user_id, archived_bookings=0, archived_cancellations=0, archived_completions=0)
+            db.add(stats)
+        stats.archived_bookings += total
+        stats.archived_cancellations += cancelled
+        stats.archived_completions += completed
+
+def archive_batch(db: Session, cutoff: date, after_id: int = 0, batch_size: int = ARCHIVE_BATCH_SIZE) -> Tuple[int, int]:
+    """Move one batch of old finished bookings into the archive; returns (moved, last id seen)"""
+    cutoff_key = cutoff.year * 10000 + cutoff.month * 100 + cutoff.day
+    booking_ids = db.execute(
+        select(Booking.id)
+        .where(Booking.id > after_id, Booking.status.in_(ARCHIVED_STATUSES), ARRIVAL_KEY < cutoff_key)
+        .order_by(Booking.id)
+        .limit(batch_size)
+    ).scalars().all()
+    if not booking_ids:
+        return 0, after_id
+    last_id = booking_ids[-1]
+
+    # Tables created before ids stopped being reused can hold a live booking with an archived booking's id;
+    # leave those in place rather than overwrite the archived row or fail the whole batch
+    conflicts = set(db.execute(select(BookingArchive.id).where(BookingArchive.id.in_(booking_ids))).scalars())
+    if conflicts:
+        print(f"Archive: skipped {len(conflicts)} bookings whose id is already archived: {sorted(conflicts)[:10]}")
+        booking_ids = [booking_id for booking_id in booking_ids if booking_id not in conflicts]
+        if not booking_ids:
+            return 0, last_id
+
+    # Copy, count and delete in one transaction so an interrupted run never loses or duplicates rows
+    live = Booking.__table__
+    db.execute(
+        insert(BookingArchive.__table__).from_select(
+            BOOKING_HISTORY_COLUMNS,
+            select(*(live.c[name] for name in BOOKING_HISTORY_COLUMNS)).where(live.c.id.in_(booking_ids)),
+        )
+    )
+    _add_archived_counts(db, booking_ids)
+    db.execute(delete(Booking).where(Booking.id.in_(booking_ids)))
+    db.commit()
+    return len(booking_ids), last_id
+
+def archive_bookings(db: Session, today: Optional[date] = None, horizon_days: int = ARCHIVE_HORIZON_DAYS,
+                     batch_size: int = ARCHIVE_BATCH_SIZE, max_batches: Optional[int] = None) -> dict:
+    """Archive completed and cancelled bookings that arrived more than horizon_days ago"""
+    if horizon_days < 1:
+        # A cutoff of today or later would archive bookings whose arrival is still ahead
+        raise ValueError(f"horizon_days must be at least 1, got {horizon_days}")
+    cutoff = (today or date.today()) - timedelta(days=horizon_days)
+    archived = batches = 0
+    last_id = 0
+    # Each batch commits on its own, so a rerun simply picks up whatever is left
+    while max_batches is None or batches < max_batches:
+        moved, next_id = archive_batch(db, cutoff, after_id=last_id, batch_size=batch_size)
+        if next_id == last_id:
+            break
+        last_id = next_id
+        archived += moved
+        batches += 1
+    return {"archived_bookings": archived, "batches": batches, "cutoff": cutoff.isoformat()}
+
+def main():
+    parser = argparse.ArgumentParser(description="Move old completed and cancelled bookings into the archive table")
+    parser.add_argument("--horizon-days", type=int, default=ARCHIVE_HORIZON_DAYS, help="Archive bookings that arrived more than this many days ago")
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE, help="Bookings moved per transaction")
+    parser.add_argument("--max-batches", type=int, default=None, help="Stop after this many batches")
+    args = parser.parse_args()
+
+    create_tables()
+    db = SessionLocal()
+    try:
+        result = archive_bookings(db, horizon_days=args.horizon_days, batch_size=args.batch_size, max_batches=args.max_batches)
+        print(f"Archived {result['archived_bookings']} bookings in {result['batches']} batches (arrived before {result['cutoff']})")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
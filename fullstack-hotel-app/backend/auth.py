@@ -1,12 +1,13 @@
 from datetime import datetime, timedelta
 from typing import Optional
+import hmac
 import os
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from database import get_db, User
+from database import get_db, SessionLocal, User
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -15,9 +16,16 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY", "fallback-secret-key")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+# Event stream tickets go in a URL (EventSource cannot send headers), so they expire quickly
+# and are only accepted by the stream
+EVENT_TICKET_EXPIRE_SECONDS = int(os.getenv("EVENT_TICKET_EXPIRE_SECONDS", 30))
+EVENT_TICKET_SCOPE = "events"
+# Static bearer token for the metrics scraper; admins can always use their own access token
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
@@ -39,17 +47,21 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str) -> Optional[str]:
-    """Verify JWT token and return email"""
+def verify_token(token: str, scope: Optional[str] = None) -> Optional[str]:
+    """Verify JWT token and return email; access tokens have no scope, stream tickets do"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
-        if email is None:
+        if email is None or payload.get("scope") != scope:
             return None
         return email
     except JWTError:
         return None
 
+def create_event_ticket(email: str) -> str:
+    """Create a short-lived token that only opens the admin event stream"""
+    return create_access_token({"sub": email, "scope": EVENT_TICKET_SCOPE}, timedelta(seconds=EVENT_TICKET_EXPIRE_SECONDS))
+
 def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
     """Authenticate user with email and password"""
     user = db.query(User).filter(User.email == email).first()
@@ -92,3 +104,51 @@ def get_current_admin_user(current_user: User = Depends(get_current_active_user)
             detail="Not enough permissions"
         )
     return current_user
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+def _admin_user_for_email(email: Optional[str]) -> User:
+    """Load the active admin a verified token names, without holding a session afterwards"""
+    if email is None:
+        raise _credentials_exception()
+    
+    # Use a short-lived session so a long request (e.g. an open stream) does not hold a pooled connection
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.email == email).first()
+    finally:
+        db.close()
+    
+    if user is None:
+        raise _credentials_exception()
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    if user.role != "ADMIN":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return user
+
+def get_event_stream_admin_user(
+    ticket: Optional[str] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+) -> User:
+    """Get the admin user of an event stream from the bearer header or a stream ticket query parameter"""
+    # EventSource cannot set headers, so browsers pass a ticket from POST /admin/events/ticket instead
+    if credentials is not None:
+        return _admin_user_for_email(verify_token(credentials.credentials))
+    return _admin_user_for_email(verify_token(ticket, scope=EVENT_TICKET_SCOPE) if ticket else None)
+
+def require_metrics_access(credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)):
+    """Allow the scraper's METRICS_TOKEN or an admin access token"""
+    if credentials is None:
+        raise _credentials_exception()
+    if METRICS_TOKEN and hmac.compare_digest(credentials.credentials.encode(), METRICS_TOKEN.encode()):
+        return
+    _admin_user_for_email(verify_token(credentials.credentials))
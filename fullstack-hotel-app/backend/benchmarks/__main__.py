@@ -0,0 +1,114 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks for the booking and prediction API")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Generate a dataset and run the benchmarks")
+    run.add_argument("--bookings", type=int, default=10_000, help="Number of synthetic bookings")
+    run.add_argument("--users", type=int, default=None, help="Number of synthetic users (default: bookings / 20)")
+    run.add_argument("--seed", type=int, default=0, help="Random seed for the dataset")
+    run.add_argument("--db", default=None, help="SQLite file to use (default: a temporary file)")
+    run.add_argument("--iterations", type=int, default=1000, help="Calls per microbenchmark")
+    run.add_argument("--requests", type=int, default=200, help="Requests per load-test level")
+    run.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    run.add_argument("--skip-micro", action="store_true", help="Skip the microbenchmarks")
+    run.add_argument("--skip-load", action="store_true", help="Skip the ASGI load tests")
+    run.add_argument("--output", default="benchmark-results.json", help="Where to write the JSON report")
+
+    compare = commands.add_parser("compare", help="Compare a report against a stored baseline")
+    compare.add_argument("baseline", help="Baseline JSON report")
+    compare.add_argument("current", help="Current JSON report")
+    compare.add_argument("--threshold", type=float, default=0.10, help="Allowed relative slowdown (0.10 = 10%%)")
+
+    return parser.parse_args(argv)
+
+def run(args) -> int:
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix="hotel-bench-"), "bench.db")
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    # Must be set before the app modules create their engine
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    # The load tests drive a single user far past the production rate limits
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    from database import SessionLocal, Booking
+    from auth import create_access_token
+    from benchmarks.dataset import generate_dataset, bench_user_email, ADMIN_EMAIL
+    from benchmarks.load import Scenario, run_load_tests
+    from benchmarks.micro import run_micro_benchmarks
+    from benchmarks.serialization import run_serialization_benchmarks
+    from benchmarks.report import build_report, write_report
+
+    db = SessionLocal()
+    try:
+        print(f"Generating {args.bookings} bookings in {db_path}...")
+        dataset = generate_dataset(db, args.bookings, users=args.users, seed=args.seed)
+        active_bookings = db.query(Booking).filter(Booking.status == "Active").count()
+        user_email = bench_user_email(db)
+
+        results = {}
+        if not args.skip_micro:
+            results.update(run_micro_benchmarks(db, iterations=args.iterations))
+            results.update(run_serialization_benchmarks(db, rows=min(args.bookings, 50_000)))
+    finally:
+        db.close()
+
+    if not args.skip_load:
+        from main import app
+
+        concurrency = tuple(int(level) for level in args.concurrency.split(","))
+        admin = {"Authorization": f"Bearer {create_access_token({'sub': ADMIN_EMAIL})}"}
+        user = {"Authorization": f"Bearer {create_access_token({'sub': user_email})}"}
+        new_booking = {
+            "room_id": 1, "booking_date": "2026-01-10", "no_of_adults": 2, "no_of_children": 0,
+            "no_of_weekend_nights": 1, "no_of_week_nights": 2, "type_of_meal_plan": "Meal Plan 1",
+            "required_car_parking_space": False, "room_type_reserved": "Room Type 1", "lead_time": 45,
+            "arrival_year": 2026, "arrival_month": 2, "arrival_date": 24, "market_segment_type": "Online",
+            "no_of_special_requests": 1,
+        }
+        scenarios = [
+            Scenario("GET /bookings/me", "GET", "/bookings/me", user, concurrency=concurrency, requests=args.requests),
+            Scenario("GET /admin/analytics/stats", "GET", "/admin/analytics/stats", admin, concurrency=concurrency, requests=args.requests),
+            Scenario("GET /admin/analytics/monthly-trends", "GET", "/admin/analytics/monthly-trends", admin, concurrency=concurrency, requests=args.requests),
+            Scenario("GET /admin/analytics/room-types", "GET", "/admin/analytics/room-types", admin, concurrency=concurrency, requests=args.requests),
+            Scenario("POST /bookings", "POST", "/bookings", user, body=new_booking, concurrency=concurrency, requests=args.requests),
+            # Bulk rescoring is measured once per run, not under concurrency
+            Scenario("POST /admin/predict-all-bookings", "POST", "/admin/predict-all-bookings", admin,
+                     rows_per_call=active_bookings, concurrency=(1,), requests=3),
+        ]
+        results.update(run_load_tests(app, scenarios))
+
+    report = build_report(results, dataset)
+    write_report(report, args.output)
+    print(f"Wrote {len(results)} results to {args.output}")
+    return 0
+
+def compare(args) -> int:
+    from benchmarks.report import compare_reports, print_comparison
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    rows = compare_reports(baseline, current, args.threshold)
+    print_comparison(rows)
+    regressions = [row for row in rows if row["regressions"]]
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.command == "run":
+        return run(args)
+    return compare(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
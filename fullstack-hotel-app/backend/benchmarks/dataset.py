@@ -0,0 +1,37 @@
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from database import User, Room, create_tables
+from auth import get_password_hash
+from seed_data import seed_users, seed_rooms, seed_bookings
+
+BENCH_PASSWORD = "bench123"
+ADMIN_EMAIL = "admin@benchhotel.com"
+BENCH_EMAIL_DOMAIN = "benchhotel.com"
+
+def generate_dataset(db: Session, bookings: int, users: int = None, seed: int = 0) -> dict:
+    """Fill an empty database with synthetic users, rooms and bookings"""
+    create_tables()
+    rng = np.random.default_rng(seed)
+    users = users or max(10, bookings // 20)
+
+    # One hash shared by every synthetic account
+    hashed_password = get_password_hash(BENCH_PASSWORD)
+    db.add(User(email=ADMIN_EMAIL, hashed_password=hashed_password, full_name="Bench Admin",
+                role="ADMIN", is_active=True, created_at=datetime.utcnow()))
+    db.commit()
+    user_ids = seed_users(db, users - 1, rng, hashed_password=hashed_password, email_domain=BENCH_EMAIL_DOMAIN)
+
+    rooms = seed_rooms(db)
+    # Load tests create bookings, so never run out of inventory
+    db.query(Room).update({Room.total_rooms: 10**9, Room.available_rooms: 10**9})
+    db.commit()
+
+    seed_bookings(db, bookings, user_ids, rooms, rng)
+    return {"users": users, "rooms": len(rooms), "bookings": bookings, "seed": seed}
+
+def bench_user_email(db: Session) -> str:
+    """Email of the first synthetic guest, used for the per-user load tests"""
+    return db.query(User.email).filter(User.role == "USER").order_by(User.id).first()[0]
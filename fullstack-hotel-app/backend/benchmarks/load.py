@@ -0,0 +1,103 @@
+import asyncio
+import json
+import time
+from typing import Dict, List, Optional, Sequence
+
+from benchmarks.report import summarize
+
+CONCURRENCY_LEVELS = (1, 8, 32)
+
+async def asgi_request(app, method: str, path: str, headers: Optional[Dict[str, str]] = None, body: bytes = b"") -> tuple:
+    """Send one request straight into the ASGI app and return (status, body)"""
+    path, _, query_string = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query_string.encode(),
+        "root_path": "",
+        "headers": [(key.lower().encode(), value.encode()) for key, value in (headers or {}).items()],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    response_complete = asyncio.Event()
+    request_sent = False
+    status = 0
+    chunks: List[bytes] = []
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await response_complete.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                response_complete.set()
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
+
+class Scenario:
+    """One endpoint exercised by the load test"""
+
+    def __init__(self, name: str, method: str, path: str, headers: Dict[str, str], body: Optional[dict] = None,
+                 rows_per_call: int = 1, concurrency: Sequence[int] = CONCURRENCY_LEVELS, requests: int = 200):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.headers = dict(headers)
+        self.body = json.dumps(body).encode() if body is not None else b""
+        if body is not None:
+            self.headers["Content-Type"] = "application/json"
+        self.rows_per_call = rows_per_call
+        self.concurrency = concurrency
+        self.requests = requests
+
+async def _run_level(app, scenario: Scenario, concurrency: int) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    remaining = scenario.requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            status, _ = await asgi_request(app, scenario.method, scenario.path, scenario.headers, scenario.body)
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    result = summarize(latencies, len(latencies) * scenario.rows_per_call, elapsed)
+    result["requests_per_sec"] = round(len(latencies) / elapsed, 2) if elapsed > 0 else 0.0
+    result["errors"] = errors
+    return result
+
+def run_load_tests(app, scenarios: Sequence[Scenario]) -> Dict[str, dict]:
+    """Run every scenario at each of its concurrency levels"""
+    async def run_all():
+        results = {}
+        for scenario in scenarios:
+            for concurrency in scenario.concurrency:
+                key = f"load.{scenario.name}@c{concurrency}"
+                results[key] = await _run_level(app, scenario, concurrency)
+                print(f"{key}: p95={results[key]['p95_ms']}ms rps={results[key]['requests_per_sec']} errors={results[key]['errors']}")
+        return results
+
+    return asyncio.run(run_all())
@@ -0,0 +1,47 @@
+import time
+from typing import Dict
+
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from database import Booking
+from ml_model import predictor
+from rescoring import FEATURE_SOURCE_COLUMNS
+from schemas import PredictionRequest
+from benchmarks.report import summarize
+
+BATCH_SIZES = (1, 100, 10_000)
+
+def _time_calls(func, arguments) -> tuple:
+    latencies = []
+    start = time.perf_counter()
+    for argument in arguments:
+        call_start = time.perf_counter()
+        func(argument)
+        latencies.append(time.perf_counter() - call_start)
+    return latencies, time.perf_counter() - start
+
+def run_micro_benchmarks(db: Session, iterations: int = 1000) -> Dict[str, dict]:
+    """Time feature preparation, single predictions and batch scoring"""
+    rows = db.execute(select(*FEATURE_SOURCE_COLUMNS).limit(max(iterations, max(BATCH_SIZES)))).all()
+    frame = pd.DataFrame(rows, columns=[column.key for column in FEATURE_SOURCE_COLUMNS])
+    requests = [
+        PredictionRequest(**{field: value for field, value in record.items() if field in PredictionRequest.model_fields})
+        for record in frame.head(iterations).to_dict("records")
+    ]
+
+    results = {}
+    latencies, elapsed = _time_calls(predictor.prepare_features, requests)
+    results["micro.prepare_features"] = summarize(latencies, len(requests), elapsed)
+
+    latencies, elapsed = _time_calls(predictor.predict, requests)
+    results["micro.predict"] = summarize(latencies, len(requests), elapsed)
+
+    for batch_size in BATCH_SIZES:
+        batch = frame.head(batch_size)
+        repeats = max(3, min(100, iterations // max(1, batch_size // 10)))
+        latencies, elapsed = _time_calls(predictor.predict_batch, [batch] * repeats)
+        results[f"micro.predict_batch[{len(batch)}]"] = summarize(latencies, len(batch) * repeats, elapsed)
+
+    return results
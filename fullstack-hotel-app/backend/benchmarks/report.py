@@ -0,0 +1,76 @@
+import json
+import platform
+import resource
+import sys
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MiB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+def summarize(latencies: List[float], rows: int, elapsed: float) -> Dict[str, float]:
+    """Summarize per-call latencies (seconds) into a result entry"""
+    values = np.asarray(latencies) * 1000
+    return {
+        "calls": len(latencies),
+        "p50_ms": round(float(np.percentile(values, 50)), 4),
+        "p95_ms": round(float(np.percentile(values, 95)), 4),
+        "p99_ms": round(float(np.percentile(values, 99)), 4),
+        "rows_per_sec": round(rows / elapsed, 2) if elapsed > 0 else 0.0,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+def build_report(results: Dict[str, dict], dataset: dict) -> dict:
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "dataset": dataset,
+        },
+        "results": results,
+    }
+
+def write_report(report: dict, path: str):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+def compare_reports(baseline: dict, current: dict, threshold: float) -> List[dict]:
+    """Compare two reports and return one row per shared benchmark"""
+    rows = []
+    for name, base in sorted(baseline["results"].items()):
+        result = current["results"].get(name)
+        if result is None:
+            continue
+        regressions = []
+        # Latency regresses when it goes up, throughput when it goes down
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            if base[metric] > 0 and result[metric] > base[metric] * (1 + threshold):
+                regressions.append(metric)
+        if base["rows_per_sec"] > 0 and result["rows_per_sec"] < base["rows_per_sec"] * (1 - threshold):
+            regressions.append("rows_per_sec")
+        rows.append({
+            "benchmark": name,
+            "baseline_p95_ms": base["p95_ms"],
+            "current_p95_ms": result["p95_ms"],
+            "baseline_rows_per_sec": base["rows_per_sec"],
+            "current_rows_per_sec": result["rows_per_sec"],
+            "regressions": regressions,
+        })
+    return rows
+
+def print_comparison(rows: List[dict]):
+    print(f"{'benchmark':<55} {'p95 base':>10} {'p95 now':>10} {'rows/s base':>13} {'rows/s now':>13}  status")
+    for row in rows:
+        status = "REGRESSION (" + ", ".join(row["regressions"]) + ")" if row["regressions"] else "ok"
+        print(
+            f"{row['benchmark']:<55} {row['baseline_p95_ms']:>10.3f} {row['current_p95_ms']:>10.3f} "
+            f"{row['baseline_rows_per_sec']:>13.1f} {row['current_rows_per_sec']:>13.1f}  {status}"
+        )
@@ -0,0 +1,38 @@
+import json
+import time
+from typing import Dict, List
+
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+
+from database import Booking
+from schemas import Booking as BookingSchema
+from serialization import booking_list_response
+from benchmarks.report import summarize
+
+def _pydantic_path(db: Session, limit: int) -> bytes:
+    """The response_model path: ORM objects validated and dumped by Pydantic"""
+    bookings = db.query(Booking).limit(limit).all()
+    adapter = TypeAdapter(List[BookingSchema])
+    content = adapter.dump_python(adapter.validate_python(bookings, from_attributes=True), mode="json")
+    db.expunge_all()
+    return json.dumps(content).encode()
+
+def _fast_path(db: Session, limit: int) -> bytes:
+    """Column tuples through the precompiled serializer and orjson"""
+    criteria = [Booking.id.in_(db.query(Booking.id).limit(limit).scalar_subquery())]
+    return booking_list_response(db, *criteria).body
+
+def run_serialization_benchmarks(db: Session, rows: int = 50_000, repeats: int = 5) -> Dict[str, dict]:
+    """Compare the admin booking list serialized via Pydantic and via the fast path"""
+    results = {}
+    for name, path in (("pydantic", _pydantic_path), ("fast", _fast_path)):
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(repeats):
+            call_start = time.perf_counter()
+            path(db, rows)
+            latencies.append(time.perf_counter() - call_start)
+        elapsed = time.perf_counter() - start
+        results[f"serialize.admin_bookings[{rows}].{name}"] = summarize(latencies, rows * repeats, elapsed)
+    return results
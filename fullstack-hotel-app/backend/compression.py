@@ -0,0 +1,159 @@
+import os
+import zlib
+from typing import List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", 1024))
+COMPRESSION_STREAMING = os.getenv("COMPRESSION_STREAMING", "true").lower() == "true"
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", 4))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+# Event streams must reach the client as soon as they are written
+EXCLUDED_TYPES = ("text/event-stream",)
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick brotli or gzip from an Accept-Encoding header"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+class _Compressor:
+    """Incremental gzip or brotli compressor"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk and flush it so the client can decode it right away"""
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.finish()
+        return self._compressor.compress(data) + self._compressor.flush()
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+def _without(headers: List[Tuple[bytes, bytes]], *names: bytes) -> List[Tuple[bytes, bytes]]:
+    return [(key, value) for key, value in headers if key.lower() not in names]
+
+class CompressionMiddleware:
+    """ASGI middleware compressing large responses with brotli or gzip"""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MINIMUM_SIZE, streaming: bool = COMPRESSION_STREAMING):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.streaming = streaming
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = dict(scope["headers"])
+        encoding = choose_encoding(request_headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+        buffered: List[bytes] = []
+
+        def compressed_headers(headers, content_length: Optional[int]):
+            headers = _without(headers, b"content-length", b"content-encoding")
+            headers.append((b"content-encoding", encoding.encode()))
+            vary = _header(headers, b"vary")
+            if vary is None:
+                headers.append((b"vary", b"Accept-Encoding"))
+            elif b"accept-encoding" not in vary.lower():
+                headers = _without(headers, b"vary") + [(b"vary", vary + b", Accept-Encoding")]
+            if content_length is not None:
+                headers.append((b"content-length", str(content_length).encode()))
+            return headers
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                content_type = (_header(headers, b"content-type") or b"").decode("latin-1")
+                if (
+                    message["status"] in (204, 304)
+                    or _header(headers, b"content-encoding") is not None
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or content_type.startswith(EXCLUDED_TYPES)
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is not None:
+                # Already streaming
+                data = compressor.compress(body) if more_body else compressor.finish(body)
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+                return
+
+            if not more_body:
+                body = b"".join(buffered) + body
+                if len(body) < self.minimum_size:
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                data = _Compressor(encoding).finish(body)
+                start_message["headers"] = compressed_headers(list(start_message.get("headers", [])), len(data))
+                await send(start_message)
+                await send({"type": "http.response.body", "body": data})
+                return
+
+            if self.streaming:
+                # Compress chunk by chunk instead of buffering the whole response
+                compressor = _Compressor(encoding)
+                start_message["headers"] = compressed_headers(list(start_message.get("headers", [])), None)
+                await send(start_message)
+                data = compressor.compress(b"".join(buffered) + body)
+                buffered.clear()
+                await send({"type": "http.response.body", "body": data, "more_body": True})
+            else:
+                buffered.append(body)
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,17 +1,53 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text, Date
+from sqlalchemy import create_engine, event, select, union_all, text, MetaData, Table, Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text, Date, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
 import os
 from dotenv import load_dotenv
+from metrics import DB_SESSIONS
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./hotel_bookings.db")
 
+# Optional replica for list and analytics routes; without one, SQLite reads use a
+# separate read-only connection pool on the same file
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL", "")
+READ_ONLY_SESSIONS = os.getenv("READ_ONLY_SESSIONS", "true").lower() == "true"
+
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def _is_file_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+def _create_read_engine():
+    """Engine for read-only sessions, or the primary engine when routing is off"""
+    if READ_DATABASE_URL:
+        read_engine = create_engine(READ_DATABASE_URL, connect_args={"check_same_thread": False} if READ_DATABASE_URL.startswith("sqlite") else {})
+    elif READ_ONLY_SESSIONS and _is_file_sqlite(engine.url):
+        path = os.path.abspath(engine.url.database)
+        read_engine = create_engine(f"sqlite:///file:{path}?mode=ro&uri=true", connect_args={"check_same_thread": False})
+    else:
+        return engine
+    
+    if read_engine.url.get_backend_name() == "sqlite":
+        @event.listens_for(read_engine, "connect")
+        def _set_query_only(dbapi_connection, connection_record):
+            # Any write through a read session fails instead of taking the write lock
+            dbapi_connection.execute("PRAGMA query_only = ON")
+    return read_engine
+
+read_engine = _create_read_engine()
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+READ_TARGET = "primary" if read_engine is engine else ("replica" if READ_DATABASE_URL else "read_only")
+
+if read_engine is not engine and _is_file_sqlite(engine.url):
+    @event.listens_for(engine, "connect")
+    def _enable_wal(dbapi_connection, connection_record):
+        # WAL lets readers run alongside the writer instead of blocking its commits
+        dbapi_connection.execute("PRAGMA journal_mode = WAL")
+
 Base = declarative_base()
 
 class User(Base):
@@ -26,6 +62,7 @@ class User(Base):
     role = Column(String, default="USER")  # USER or ADMIN
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationship
     bookings = relationship("Booking", back_populates="user")
@@ -38,16 +75,13 @@ class Room(Base):
     total_rooms = Column(Integer, nullable=False)
     available_rooms = Column(Integer, nullable=False)
     price = Column(Float, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationship
     bookings = relationship("Booking", back_populates="room")
 
-class Booking(Base):
-    __tablename__ = "bookings"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
-    room_id = Column(Integer, ForeignKey("rooms.id"))
+class BookingFields:
+    """Columns shared by live and archived bookings"""
     
     # Booking details
     booking_date = Column(Date)  # Date when booking was made
@@ -59,6 +93,7 @@ class Booking(Base):
     required_car_parking_space = Column(Boolean, default=False)
     room_type_reserved = Column(String, nullable=False)
     lead_time = Column(Integer, default=0)
+    lead_time_bucket = Column(Integer)  # Bucket of lead_time at the last scoring
     arrival_year = Column(Integer, nullable=False)
     arrival_month = Column(Integer, nullable=False)
     arrival_date = Column(Integer, nullable=False)
@@ -75,24 +110,122 @@ class Booking(Base):
     
     # Prediction and status
     cancellation_prediction = Column(Float)
+    prediction_status = Column(String, default="scored", index=True)  # scored, pending (filled in by the background scorer)
+    # Packed per-feature contributions (see explanations.py) and the model version they came from
+    prediction_explanation = Column(LargeBinary)
+    explanation_version = Column(String)
     status = Column(String, default="Active")  # Active, Cancelled, Completed
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+class Booking(BookingFields, Base):
+    __tablename__ = "bookings"
+    # Never reuse the id of an archived booking: the archive and bookings_all key on it
+    __table_args__ = {"sqlite_autoincrement": True}
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    room_id = Column(Integer, ForeignKey("rooms.id"))
     
     # Relationships
     user = relationship("User", back_populates="bookings")
     room = relationship("Room", back_populates="bookings")
 
+class BookingArchive(BookingFields, Base):
+    """Completed and cancelled bookings moved out of the live table"""
+    __tablename__ = "bookings_archive"
+    
+    # Keeps the id the booking had in the live table
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, index=True)
+    room_id = Column(Integer)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+class UserBookingStats(Base):
+    """Per-user counts of archived bookings, so guest history stays complete"""
+    __tablename__ = "user_booking_stats"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    archived_bookings = Column(Integer, default=0, nullable=False)
+    archived_cancellations = Column(Integer, default=0, nullable=False)
+    archived_completions = Column(Integer, default=0, nullable=False)
+
+class IdempotencyKey(Base):
+    """Outcome of a request sent with an Idempotency-Key header, replayed to retries"""
+    __tablename__ = "idempotency_keys"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    key = Column(String, primary_key=True)
+    # Hash of the request body, so a key reused for a different request is rejected
+    fingerprint = Column(String, nullable=False)
+    # All three empty while the first request is still running; a stored response
+    # is only replayed while its booking still exists
+    status_code = Column(Integer)
+    response_body = Column(LargeBinary)
+    booking_id = Column(Integer, ForeignKey("bookings.id", ondelete="CASCADE"), index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class RateLimitBucket(Base):
+    """Token bucket of one rate-limit key, shared by every worker (see rate_limit.DatabaseBackend)"""
+    __tablename__ = "rate_limit_buckets"
+    
+    key = Column(String, primary_key=True)
+    tokens = Column(Float, nullable=False)
+    # Wall-clock seconds, so every process refills the bucket the same way
+    updated_at = Column(Float, nullable=False, index=True)
+
+class AdminEvent(Base):
+    """Admin event published by any worker and relayed to every worker's event streams (see events.py)"""
+    __tablename__ = "admin_events"
+    # Event ids are what clients resume from, so they must never be reused
+    __table_args__ = {"sqlite_autoincrement": True}
+    
+    id = Column(Integer, primary_key=True)
+    type = Column(String, nullable=False)
+    # Encoded data line of the event, sent as-is
+    payload = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+# Live and archived bookings together, for queries that need the full history
+BOOKING_HISTORY_COLUMNS = [column.name for column in Booking.__table__.columns]
+bookings_all = Table(
+    "bookings_all",
+    MetaData(),
+    *(Column(column.name, column.type) for column in Booking.__table__.columns)
+)
+
+def _bookings_all_ddl() -> str:
+    archive = BookingArchive.__table__
+    query = union_all(
+        select(*(Booking.__table__.c[name] for name in BOOKING_HISTORY_COLUMNS)),
+        select(*(archive.c[name] for name in BOOKING_HISTORY_COLUMNS)),
+    )
+    return f"CREATE VIEW bookings_all AS {query.compile(bind=engine)}"
+
 # Create tables
 def create_tables():
     Base.metadata.create_all(bind=engine)
+    # Recreate the view so it always matches the current columns
+    with engine.begin() as connection:
+        connection.execute(text("DROP VIEW IF EXISTS bookings_all"))
+        connection.execute(text(_bookings_all_ddl()))
 
 # Dependency to get DB session
 def get_db():
+    DB_SESSIONS.labels("primary").inc()
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+# Dependency for routes that only read
+def get_read_db():
+    DB_SESSIONS.labels(READ_TARGET).inc()
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,273 @@
+import asyncio
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, Iterable, Optional, Set
+
+from sqlalchemy import delete, func, insert, select
+
+from database import engine, AdminEvent
+from leader import is_leader
+from metrics import EVENT_SUBSCRIBERS, EVENTS_PUBLISHED, EVENTS_DROPPED
+from serialization import dumps
+
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", 1000))
+EVENT_REPLAY_SIZE = int(os.getenv("EVENT_REPLAY_SIZE", 1000))
+EVENT_HEARTBEAT_SECONDS = float(os.getenv("EVENT_HEARTBEAT_SECONDS", 15))
+EVENT_BATCH_SIZE = int(os.getenv("EVENT_BATCH_SIZE", 500))
+# With several workers, how often each one relays events stored by all of them
+EVENT_RELAY_INTERVAL_SECONDS = float(os.getenv("EVENT_RELAY_INTERVAL_SECONDS", 0.5))
+# Stored events are only read by the relays, so they are kept just long enough for a slow one
+EVENT_RETENTION_SECONDS = int(os.getenv("EVENT_RETENTION_SECONDS", 300))
+
+HIGH_RISK_THRESHOLD = 0.7
+
+def encode_event(event_type: str, data: dict) -> bytes:
+    return dumps({"type": event_type, "timestamp": time.time(), "data": data})
+
+class Event:
+    """A published event, encoded once as a server-sent event frame"""
+    __slots__ = ("id", "type", "frame")
+
+    def __init__(self, event_id: int, event_type: str, payload: bytes):
+        self.id = event_id
+        self.type = event_type
+        self.frame = b"id: %d\nevent: %s\ndata: %s\n\n" % (event_id, event_type.encode(), payload)
+
+# Tells a client that it missed events and must refetch its data
+RESYNC = Event(0, "resync", encode_event("resync", {}))
+# Ends a stream on shutdown
+CLOSED = Event(0, "closed", encode_event("closed", {}))
+
+class Subscription:
+    """Bounded event queue of one client, owned by the event loop serving it"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        # Events up to this id were already sent to the client by another worker
+        self.after_id = 0
+
+    def deliver(self, event: Event):
+        """Queue an event; runs on the subscriber's event loop"""
+        if event.id and event.id <= self.after_id:
+            return
+        if self.queue.full():
+            # A slow client gets a resync instead of an unbounded backlog
+            EVENTS_DROPPED.inc(self.queue.qsize())
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = RESYNC
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: float) -> Optional[Event]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+class EventHub:
+    """Pub/sub hub for this process's event streams; publish() may be called from any thread
+
+    In-process by default. After share(), events go through the admin_events table and each
+    worker's relay delivers them, so every stream sees every worker's events with the same ids.
+    """
+
+    def __init__(self, queue_size: int = EVENT_QUEUE_SIZE, replay_size: int = EVENT_REPLAY_SIZE):
+        self.queue_size = queue_size
+        self.shared = False
+        self._lock = threading.Lock()
+        self._subscribers: Set[Subscription] = set()
+        self._ids = itertools.count(1)
+        self._last_id = 0
+        self._history: deque = deque(maxlen=replay_size)
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Subscription:
+        """Register a subscriber; must be called from the event loop that will read it"""
+        subscription = Subscription(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            if last_event_id:
+                self._replay(subscription, last_event_id)
+            self._subscribers.add(subscription)
+        EVENT_SUBSCRIBERS.inc()
+        return subscription
+
+    def _replay(self, subscription: Subscription, last_event_id: str):
+        """Queue the events a reconnecting client missed, or a resync if they are gone"""
+        try:
+            last_id = int(last_event_id)
+        except ValueError:
+            subscription.deliver(RESYNC)
+            return
+        if last_id > self._last_id:
+            if self.shared:
+                # The client came from a worker whose relay is ahead of this one's; it catches up shortly
+                subscription.after_id = last_id
+            else:
+                # Ids restart with the process, so an id from the future means missed events
+                subscription.deliver(RESYNC)
+            return
+        if last_id < self._last_id and (not self._history or self._history[0].id > last_id + 1):
+            subscription.deliver(RESYNC)
+            return
+        for event in self._history:
+            if event.id > last_id:
+                subscription.deliver(event)
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.discard(subscription)
+                EVENT_SUBSCRIBERS.dec()
+
+    def share(self):
+        """Publish through the admin_events table, for several workers; call before they start"""
+        self.shared = True
+
+    def publish(self, event_type: str, data: dict):
+        """Publish an event to every subscriber"""
+        payload = encode_event(event_type, data)
+        if self.shared:
+            try:
+                # The relay of every worker, this one included, delivers it
+                with engine.begin() as connection:
+                    connection.execute(insert(AdminEvent.__table__).values(
+                        type=event_type, payload=payload, created_at=datetime.utcnow()
+                    ))
+            except Exception as e:
+                # The change itself is already committed; dashboards catch up on their next resync
+                print(f"Event publish error: {e}")
+                return
+        else:
+            with self._lock:
+                self._deliver(Event(next(self._ids), event_type, payload))
+        EVENTS_PUBLISHED.labels(event_type).inc()
+
+    def _deliver(self, event: Event):
+        """Record and queue an event for every subscriber; the caller holds the lock"""
+        self._last_id = event.id
+        self._history.append(event)
+        # Delivering under the lock keeps events in id order for every subscriber
+        for subscription in list(self._subscribers):
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # The subscriber's loop has already been closed
+                self._subscribers.discard(subscription)
+                EVENT_SUBSCRIBERS.dec()
+
+    def skip_to_latest(self):
+        """Start relaying after the newest stored event, rather than replaying old ones"""
+        table = AdminEvent.__table__
+        with engine.connect() as connection:
+            latest = connection.execute(select(func.max(table.c.id))).scalar() or 0
+        with self._lock:
+            self._last_id = max(self._last_id, latest)
+
+    def relay(self, batch_size: int = EVENT_BATCH_SIZE) -> int:
+        """Deliver stored events newer than the last one relayed; returns how many there were"""
+        table = AdminEvent.__table__
+        with engine.connect() as connection:
+            rows = connection.execute(
+                select(table.c.id, table.c.type, table.c.payload)
+                .where(table.c.id > self._last_id).order_by(table.c.id).limit(batch_size)
+            ).all()
+        with self._lock:
+            for event_id, event_type, payload in rows:
+                self._deliver(Event(event_id, event_type, payload))
+        return len(rows)
+
+    def close(self):
+        """End every open stream"""
+        with self._lock:
+            for subscription in self._subscribers:
+                try:
+                    subscription.loop.call_soon_threadsafe(subscription.deliver, CLOSED)
+                except RuntimeError:
+                    pass
+
+    async def stream(self, subscription: Subscription, heartbeat: float = EVENT_HEARTBEAT_SECONDS) -> AsyncIterator[bytes]:
+        """Yield server-sent event frames, with a comment line as heartbeat"""
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                event = await subscription.get(heartbeat)
+                if event is None:
+                    yield b": keepalive\n\n"
+                    continue
+                if event is CLOSED:
+                    break
+                yield event.frame
+        finally:
+            self.unsubscribe(subscription)
+
+event_hub = EventHub()
+
+def prune_events(retention_seconds: int = EVENT_RETENTION_SECONDS) -> int:
+    """Delete stored events every relay has long since read"""
+    table = AdminEvent.__table__
+    cutoff = datetime.utcnow() - timedelta(seconds=retention_seconds)
+    with engine.begin() as connection:
+        return connection.execute(delete(table).where(table.c.created_at < cutoff)).rowcount
+
+def _relay_events(stop_event: threading.Event, interval: float):
+    """Relay stored events every `interval` seconds until stopped; the leader also prunes them"""
+    next_prune = time.monotonic()
+    while not stop_event.wait(interval):
+        try:
+            # Keep reading while full batches come back, so a burst doesn't fall behind
+            while event_hub.relay() >= EVENT_BATCH_SIZE:
+                pass
+            if is_leader() and time.monotonic() >= next_prune:
+                prune_events()
+                next_prune = time.monotonic() + EVENT_RETENTION_SECONDS / 10
+        except Exception as e:
+            print(f"Event relay error: {e}")
+
+_stop_event = threading.Event()
+
+def start_event_relay(interval: float = EVENT_RELAY_INTERVAL_SECONDS) -> Optional[threading.Thread]:
+    """Start the thread delivering other workers' events (only when the hub is shared)"""
+    if not event_hub.shared or interval <= 0:
+        return None
+    
+    event_hub.skip_to_latest()
+    _stop_event.clear()
+    thread = threading.Thread(target=_relay_events, args=(_stop_event, interval), daemon=True, name="event-relay")
+    thread.start()
+    return thread
+
+def stop_event_relay():
+    """Signal the event relay thread to stop"""
+    _stop_event.set()
+
+def publish_stats_delta(stats: Dict[str, int], monthly_trends: Optional[Dict[int, int]] = None,
+                        room_types: Optional[Dict[str, int]] = None):
+    """Publish changes to the analytics counters, skipping zero deltas"""
+    data = {"stats": {key: value for key, value in stats.items() if value}}
+    if monthly_trends:
+        data["monthly_trends"] = {str(month): count for month, count in monthly_trends.items()}
+    if room_types:
+        data["room_types"] = room_types
+    if data["stats"] or len(data) > 1:
+        event_hub.publish("stats.delta", data)
+
+def publish_predictions(booking_ids: Iterable[int], old_predictions: Iterable[Optional[float]],
+                        new_predictions: Iterable[float]):
+    """Publish updated predictions in batches, plus the change in high-risk bookings"""
+    batch = []
+    high_risk_delta = 0
+    for booking_id, old, new in zip(booking_ids, old_predictions, new_predictions):
+        new = round(float(new), 4)
+        batch.append([int(booking_id), new])
+        # NaN and None compare False, i.e. not high risk
+        high_risk_delta += int(new >= HIGH_RISK_THRESHOLD) - int(old is not None and old >= HIGH_RISK_THRESHOLD)
+        if len(batch) >= EVENT_BATCH_SIZE:
+            event_hub.publish("prediction.updated", {"predictions": batch})
+            batch = []
+    if batch:
+        event_hub.publish("prediction.updated", {"predictions": batch})
+    publish_stats_delta({"high_risk_bookings": int(high_risk_delta)})
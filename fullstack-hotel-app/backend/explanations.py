@@ -0,0 +1,169 @@
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sqlalchemy.orm import Session
+
+from database import Booking
+from events import HIGH_RISK_THRESHOLD
+from metrics import INFERENCE_STAGE_LATENCY, INFERENCE_ROWS
+from ml_model import predictor, FEATURE_COLUMNS, risk_level_for
+
+# Stored as float32: the base value followed by one contribution per feature
+EXPLANATION_DTYPE = np.float32
+
+def explanation_method(model) -> str:
+    """Pick the cheapest exact method the model supports"""
+    # Fitted decision trees and forests of them, duck-typed rather than tied to sklearn's private base classes
+    trees = getattr(model, "estimators_", [model])
+    if hasattr(model, "decision_path") and len(trees) > 0 and all(hasattr(tree, "tree_") for tree in trees):
+        return "tree_path"
+    if hasattr(model, "coef_"):
+        return "linear"
+    return "occlusion"
+
+def _cancel_index(model) -> int:
+    # Class 0 = canceled, as in MLPredictor
+    return list(model.classes_).index(0)
+
+class _TreePathTables:
+    """Per-model matrix mapping each node on a decision path to the change it makes, by split feature"""
+
+    def __init__(self, model):
+        self.model = model
+        trees = model.estimators_ if hasattr(model, "estimators_") else [model]
+        cancel = _cancel_index(model)
+        blocks = []
+        base = 0.0
+        for estimator in trees:
+            tree = estimator.tree_
+            values = tree.value[:, 0, :]
+            # Fraction of canceled training rows reaching each node
+            node_values = values[:, cancel] / values.sum(axis=1)
+
+            parents = np.full(tree.node_count, -1)
+            for children in (tree.children_left, tree.children_right):
+                internal = np.flatnonzero(children >= 0)
+                parents[children[internal]] = internal
+
+            # Moving from a parent to a child is credited to the feature the parent split on
+            child_nodes = np.flatnonzero(parents >= 0)
+            blocks.append(sparse.csr_matrix(
+                (
+                    node_values[child_nodes] - node_values[parents[child_nodes]],
+                    (child_nodes, tree.feature[parents[child_nodes]]),
+                ),
+                shape=(tree.node_count, model.n_features_in_),
+            ))
+            base += node_values[0]
+
+        self.deltas = sparse.vstack(blocks).tocsr() / len(trees)
+        self.base = base / len(trees)
+
+    def explain(self, scaled: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        indicator = self.model.decision_path(scaled)
+        if isinstance(indicator, tuple):
+            indicator = indicator[0]
+        contributions = np.asarray((indicator @ self.deltas).todense())
+        return np.full(len(scaled), self.base), contributions
+
+_tables: Optional[_TreePathTables] = None
+_tables_lock = threading.Lock()
+
+def _tree_tables(model) -> _TreePathTables:
+    """Build the path tables once per loaded model"""
+    global _tables
+    with _tables_lock:
+        if _tables is None or _tables.model is not model:
+            _tables = _TreePathTables(model)
+        return _tables
+
+def _explain_linear(model, scaled: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Log-odds of the canceled class; scaled features are centered, so coef * x is relative to the average booking
+    sign = -1.0 if _cancel_index(model) == 0 else 1.0
+    coef = sign * np.ravel(model.coef_[0])
+    base = sign * float(np.ravel(model.intercept_)[0])
+    return np.full(len(scaled), base), scaled * coef
+
+def _explain_occlusion(model, scaled: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Change in cancellation probability when each feature is replaced by its training mean"""
+    cancel = _cancel_index(model)
+    rows, features = scaled.shape
+    # One predict_proba call for every (row, feature) pair
+    occluded = np.repeat(scaled[:, None, :], features, axis=1)
+    occluded[:, np.arange(features), np.arange(features)] = 0.0
+    probabilities = model.predict_proba(np.vstack([scaled, occluded.reshape(-1, features)]))[:, cancel]
+    full = probabilities[:rows]
+    without = probabilities[rows:].reshape(rows, features)
+    base = model.predict_proba(np.zeros((1, features)))[0, cancel]
+    return np.full(rows, base), full[:, None] - without
+
+def explain_frame(frame: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, str, Optional[str]]:
+    """Return (base values, per-feature contributions, method, model version) for a batch of bookings"""
+    model, scaler, version = predictor._artifacts
+    if model is None or scaler is None:
+        raise RuntimeError("Model not loaded")
+
+    method = explanation_method(model)
+    with INFERENCE_STAGE_LATENCY.labels("explain").time():
+        scaled = scaler.transform(predictor.prepare_feature_matrix(frame))
+        if method == "tree_path":
+            base, contributions = _tree_tables(model).explain(scaled)
+        elif method == "linear":
+            base, contributions = _explain_linear(model, scaled)
+        else:
+            base, contributions = _explain_occlusion(model, scaled)
+    INFERENCE_ROWS.labels("explain").inc(len(frame))
+    return base, contributions, method, version
+
+def pack_explanation(base: float, contributions: np.ndarray) -> bytes:
+    return np.concatenate([[base], contributions]).astype(EXPLANATION_DTYPE).tobytes()
+
+def unpack_explanation(blob: bytes) -> Tuple[float, np.ndarray]:
+    values = np.frombuffer(blob, dtype=EXPLANATION_DTYPE)
+    return float(values[0]), values[1:]
+
+def explanation_updates(frame: pd.DataFrame, probabilities: np.ndarray) -> Tuple[List[Optional[bytes]], Optional[str]]:
+    """Packed explanations for the High-risk rows of a scored batch (None for the others)"""
+    blobs: List[Optional[bytes]] = [None] * len(frame)
+    high_risk = np.flatnonzero(np.asarray(probabilities) >= HIGH_RISK_THRESHOLD)
+    if len(high_risk) == 0:
+        return blobs, None
+
+    base, contributions, _, version = explain_frame(frame.iloc[high_risk])
+    for position, row in enumerate(high_risk):
+        blobs[row] = pack_explanation(base[position], contributions[position])
+    return blobs, version
+
+def booking_frame(bookings: List[Booking]) -> pd.DataFrame:
+    """Feature source columns of already-loaded bookings"""
+    # The last two features are derived in prepare_feature_matrix
+    return pd.DataFrame([{column: getattr(booking, column) for column in FEATURE_COLUMNS[:-2]} for booking in bookings])
+
+def booking_explanation(db: Session, booking: Booking) -> dict:
+    """Serve the stored explanation, computing and storing it first if missing or from another model"""
+    cached = booking.prediction_explanation is not None and booking.explanation_version == predictor.version
+    if not cached:
+        base, contributions, _, version = explain_frame(booking_frame([booking]))
+        booking.prediction_explanation = pack_explanation(base[0], contributions[0])
+        booking.explanation_version = version
+        db.commit()
+
+    base, contributions = unpack_explanation(booking.prediction_explanation)
+    order = np.argsort(-np.abs(contributions), kind="stable")
+    probability = booking.cancellation_prediction
+    return {
+        "booking_id": booking.id,
+        "cancellation_prediction": probability,
+        "risk_level": risk_level_for(probability) if probability is not None else "Unknown",
+        "model_version": booking.explanation_version,
+        "method": explanation_method(predictor.model),
+        "cached": cached,
+        "base_value": round(base, 4),
+        "contributions": [
+            {"feature": FEATURE_COLUMNS[index], "contribution": round(float(contributions[index]), 4)}
+            for index in order
+        ],
+    }
@@ -0,0 +1,76 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from database import User, Room, Booking, bookings_all
+from metrics import record_cache
+
+CACHE_CONTROL = "private, no-cache"
+
+def _validators(*parts) -> Tuple[str, Optional[datetime]]:
+    """Build a weak ETag and Last-Modified from list fingerprint parts"""
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+    timestamps = [part for part in parts if isinstance(part, datetime)]
+    return f'W/"{digest}"', max(timestamps) if timestamps else None
+
+def booking_list_validators(db: Session, scope: str, *criteria) -> Tuple[str, Optional[datetime]]:
+    """Fingerprint a booking list (e.g. scope "user:5") by row count and the newest Booking, User and Room updated_at"""
+    return _booking_validators(db, Booking.__table__, scope, *criteria)
+
+def booking_history_validators(db: Session, scope: str, *criteria) -> Tuple[str, Optional[datetime]]:
+    """Fingerprint a list read from bookings_all; archiving moves rows without changing it"""
+    return _booking_validators(db, bookings_all, scope, *criteria)
+
+def _booking_validators(db: Session, table, scope: str, *criteria) -> Tuple[str, Optional[datetime]]:
+    count, newest = db.execute(
+        select(func.count(table.c.id), func.max(table.c.updated_at)).where(*criteria)
+    ).one()
+    # Bookings embed their user and room, so profile edits and availability changes
+    # (including those made by other users' bookings) must change the fingerprint too
+    newest_user = db.execute(select(func.max(User.updated_at))).scalar()
+    newest_room = db.execute(select(func.max(Room.updated_at))).scalar()
+    return _validators("bookings", scope, count, newest, newest_user, newest_room)
+
+def user_list_validators(db: Session) -> Tuple[str, Optional[datetime]]:
+    """Fingerprint the user list by row count and newest User.updated_at"""
+    count, newest = db.execute(select(func.count(User.id), func.max(User.updated_at))).one()
+    return _validators("users", count, newest)
+
+def _not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        # Weak comparison: W/"x" matches "x"
+        return "*" in tags or etag in tags or etag[2:] in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+    return False
+
+def conditional_response(request: Request, validators: Tuple[str, Optional[datetime]],
+                         build: Callable[[], Response], cache: str = "http") -> Response:
+    """Return 304 when the client's copy is current, otherwise build the response"""
+    etag, last_modified = validators
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.replace(tzinfo=timezone.utc), usegmt=True)
+
+    if _not_modified(request, etag, last_modified):
+        record_cache(cache, True)
+        return Response(status_code=304, headers=headers)
+
+    record_cache(cache, False)
+    response = build()
+    response.headers.update(headers)
+    return response
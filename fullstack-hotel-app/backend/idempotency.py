@@ -0,0 +1,149 @@
+import hashlib
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException
+from fastapi.responses import Response
+from sqlalchemy import delete, exists, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database import Booking, IdempotencyKey
+from metrics import IDEMPOTENCY_REQUESTS
+from serialization import dumps
+
+IDEMPOTENCY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_TTL_HOURS", 24))
+# How long a duplicate waits for the first request before giving up with 409
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", 30))
+IDEMPOTENCY_POLL_SECONDS = 0.1
+# An unfinished record this old was left by a worker that died mid-request
+IDEMPOTENCY_STALE_SECONDS = float(os.getenv("IDEMPOTENCY_STALE_SECONDS", 120))
+MAX_KEY_LENGTH = 255
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+def request_fingerprint(payload: dict) -> str:
+    return hashlib.sha256(dumps(payload)).hexdigest()
+
+def _expired(record: IdempotencyKey) -> bool:
+    age = datetime.utcnow() - record.created_at
+    if record.response_body is None:
+        return age > timedelta(seconds=IDEMPOTENCY_STALE_SECONDS)
+    return age > timedelta(hours=IDEMPOTENCY_TTL_HOURS)
+
+def _orphaned(db: Session, record: IdempotencyKey) -> bool:
+    """Whether the booking a stored response describes is gone (SQLite doesn't enforce the cascade)"""
+    if record.booking_id is None:
+        return False
+    return db.execute(select(Booking.id).where(Booking.id == record.booking_id)).first() is None
+
+def purge_expired_keys(db: Session) -> int:
+    """Delete stored outcomes older than the TTL or whose booking no longer exists"""
+    cutoff = datetime.utcnow() - timedelta(hours=IDEMPOTENCY_TTL_HOURS)
+    orphaned = IdempotencyKey.booking_id.isnot(None) & ~exists().where(Booking.id == IdempotencyKey.booking_id)
+    deleted = db.execute(delete(IdempotencyKey).where((IdempotencyKey.created_at < cutoff) | orphaned)).rowcount
+    db.commit()
+    return deleted
+
+class IdempotentRequest:
+    """Run a request once per (user, Idempotency-Key) and replay its response to retries
+
+    The idempotency_keys row is the only state, so retries are answered the same by every worker.
+
+    Used as a context manager around the route body: if `replay` is set the route returns it,
+    otherwise it does its work without committing and returns `respond(...)`. Errors release
+    the key for a retry.
+    """
+
+    def __init__(self, db: Session, user_id: int, key: Optional[str], payload: dict):
+        if key is not None and not 0 < len(key) <= MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+        self.db = db
+        self.key = key
+        self.record_key = (user_id, key)
+        self.fingerprint = request_fingerprint(payload) if key is not None else None
+        self.replay: Optional[Response] = None
+        self._claimed = False
+
+    def __enter__(self) -> "IdempotentRequest":
+        if self.key is not None:
+            self.replay = self._begin()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is not None and self._claimed:
+            # Nothing was stored, so a retry runs the request again
+            self.db.rollback()
+            self.db.execute(delete(IdempotencyKey).where(
+                IdempotencyKey.user_id == self.record_key[0], IdempotencyKey.key == self.key
+            ))
+            self.db.commit()
+            self._claimed = False
+        return False
+
+    def _check_fingerprint(self, fingerprint: str):
+        if fingerprint != self.fingerprint:
+            IDEMPOTENCY_REQUESTS.labels("mismatch").inc()
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+
+    def _replay(self, fingerprint: str, status_code: int, body: bytes, outcome: str) -> Response:
+        self._check_fingerprint(fingerprint)
+        IDEMPOTENCY_REQUESTS.labels(outcome).inc()
+        return Response(content=body, status_code=status_code, media_type="application/json",
+                        headers={REPLAYED_HEADER: "true"})
+
+    def _claim(self) -> Optional[IdempotencyKey]:
+        """Insert the in-progress record; returns the existing one if another request got there first"""
+        user_id, key = self.record_key
+        self.db.add(IdempotencyKey(user_id=user_id, key=key, fingerprint=self.fingerprint))
+        try:
+            self.db.commit()
+            return None
+        except IntegrityError:
+            self.db.rollback()
+        record = self.db.get(IdempotencyKey, self.record_key, populate_existing=True)
+        if record is not None and (_expired(record) or _orphaned(self.db, record)):
+            self.db.delete(record)
+            self.db.commit()
+            return self._claim()
+        return record
+
+    def _begin(self) -> Optional[Response]:
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+        waited = False
+        while True:
+            record = self._claim()
+            if record is None:
+                self._claimed = True
+                IDEMPOTENCY_REQUESTS.labels("claimed").inc()
+                return None
+
+            if record.response_body is not None:
+                return self._replay(record.fingerprint, record.status_code, record.response_body,
+                                    "replayed_waited" if waited else "replayed")
+            self._check_fingerprint(record.fingerprint)
+
+            # Still running, in this worker or another: poll its record
+            self.db.expunge(record)
+            waited = True
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(IDEMPOTENCY_POLL_SECONDS)
+
+        IDEMPOTENCY_REQUESTS.labels("in_progress").inc()
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+
+    def respond(self, content, status_code: int = 200, booking_id: Optional[int] = None) -> Response:
+        """Commit the route's changes together with the stored response, and return the response"""
+        body = dumps(content)
+        record = self.db.get(IdempotencyKey, self.record_key) if self._claimed else None
+        if record is not None:
+            record.status_code = status_code
+            record.response_body = body
+            record.booking_id = booking_id
+        # One transaction, so a crash can't leave a booking without its stored response
+        self.db.commit()
+        self._claimed = False
+        return Response(content=body, status_code=status_code, media_type="application/json")
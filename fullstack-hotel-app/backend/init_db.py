@@ -2,10 +2,13 @@ import os
 import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from sqlalchemy.orm import Session
-from database import engine, SessionLocal, User, Room, Booking, create_tables
+import numpy as np
+from database import SessionLocal, User, create_tables
 from auth import get_password_hash
-from datetime import datetime
+from seed_data import reset_database, score_unscored_bookings, seed_rooms, seed_bookings
+
+SEED_BOOKINGS = int(os.getenv("SEED_BOOKINGS", 500))
+SEED = int(os.getenv("SEED", 42))
 
 def init_database():
     """Initialize database with mock accounts and data"""
@@ -17,10 +20,9 @@ def init_database():
         # Clear existing users and recreate with proper mock accounts
         print("Clearing existing data and creating mock accounts...")
         
-        # Delete existing data
-        db.query(Booking).delete()
-        db.query(User).delete()
-        db.query(Room).delete()
+        # Delete existing data, including archived bookings and per-user archive counts,
+        # which would otherwise attach to the recreated users once their ids are reused
+        reset_database(db)
         
         # Create mock users (same as original Streamlit app)
         print("Creating mock users...")
@@ -73,10 +75,12 @@ def init_database():
             }
         ]
         
+        # Hash each distinct password once
+        password_hashes = {password: get_password_hash(password) for password in {u["password"] for u in regular_users}}
         for user_data in regular_users:
             user = User(
                 email=user_data["email"],
-                hashed_password=get_password_hash(user_data["password"]),
+                hashed_password=password_hashes[user_data["password"]],
                 full_name=user_data["full_name"],
                 phone=user_data["phone"],
                 city=user_data["city"],
@@ -85,110 +89,21 @@ def init_database():
             )
             db.add(user)
         
-        # Create room types
-        print("Creating room types...")
-        rooms = [
-            {"room_type": "Room_Type 1", "total_rooms": 50, "available_rooms": 45, "price": 100.0},
-            {"room_type": "Room_Type 2", "total_rooms": 30, "available_rooms": 25, "price": 150.0},
-            {"room_type": "Room_Type 3", "total_rooms": 20, "available_rooms": 18, "price": 200.0},
-            {"room_type": "Room_Type 4", "total_rooms": 15, "available_rooms": 12, "price": 250.0},
-            {"room_type": "Room_Type 5", "total_rooms": 10, "available_rooms": 8, "price": 300.0},
-            {"room_type": "Room_Type 6", "total_rooms": 8, "available_rooms": 6, "price": 350.0},
-            {"room_type": "Room_Type 7", "total_rooms": 5, "available_rooms": 4, "price": 400.0}
-        ]
-        
-        for room_data in rooms:
-            room = Room(
-                room_type=room_data["room_type"],
-                total_rooms=room_data["total_rooms"],
-                available_rooms=room_data["available_rooms"],
-                price=room_data["price"]
-            )
-            db.add(room)
-        
-        # Commit users and rooms first
+        # Commit users first
         db.commit()
         
-        # Create some sample bookings
-        print("Creating sample bookings...")
-        sample_bookings = [
-            {
-                "user_id": 2,  # John Doe
-                "room_id": 1,
-                "no_of_adults": 2,
-                "no_of_children": 1,
-                "no_of_weekend_nights": 2,
-                "no_of_week_nights": 3,
-                "type_of_meal_plan": "Meal Plan 1",
-                "required_car_parking_space": True,
-                "room_type_reserved": "Room_Type 1",
-                "lead_time": 30,
-                "arrival_year": 2024,
-                "arrival_month": 6,
-                "arrival_date": 15,
-                "market_segment_type": "Online",
-                "repeated_guest": False,
-                "no_of_previous_cancellations": 0,
-                "no_of_previous_bookings_not_cancelled": 2,
-                "avg_price_per_room": 100.0,
-                "no_of_special_requests": 1,
-                "status": "Active"
-            },
-            {
-                "user_id": 3,  # Jane Smith
-                "room_id": 2,
-                "no_of_adults": 1,
-                "no_of_children": 0,
-                "no_of_weekend_nights": 1,
-                "no_of_week_nights": 4,
-                "type_of_meal_plan": "Meal Plan 2",
-                "required_car_parking_space": False,
-                "room_type_reserved": "Room_Type 2",
-                "lead_time": 45,
-                "arrival_year": 2024,
-                "arrival_month": 7,
-                "arrival_date": 20,
-                "market_segment_type": "Offline",
-                "repeated_guest": True,
-                "no_of_previous_cancellations": 1,
-                "no_of_previous_bookings_not_cancelled": 3,
-                "avg_price_per_room": 150.0,
-                "no_of_special_requests": 0,
-                "status": "Active"
-            },
-            {
-                "user_id": 4,  # Mike Wilson
-                "room_id": 3,
-                "no_of_adults": 2,
-                "no_of_children": 2,
-                "no_of_weekend_nights": 3,
-                "no_of_week_nights": 2,
-                "type_of_meal_plan": "Meal Plan 3",
-                "required_car_parking_space": True,
-                "room_type_reserved": "Room_Type 3",
-                "lead_time": 60,
-                "arrival_year": 2024,
-                "arrival_month": 8,
-                "arrival_date": 10,
-                "market_segment_type": "Corporate",
-                "repeated_guest": False,
-                "no_of_previous_cancellations": 0,
-                "no_of_previous_bookings_not_cancelled": 1,
-                "avg_price_per_room": 200.0,
-                "no_of_special_requests": 2,
-                "status": "Cancelled"
-            }
-        ]
+        # Create room types
+        print("Creating room types...")
+        rooms = seed_rooms(db)
         
-        for booking_data in sample_bookings:
-            # Calculate derived fields
-            booking_data["no_of_individuals"] = booking_data["no_of_adults"] + booking_data["no_of_children"]
-            booking_data["no_of_days_booked"] = booking_data["no_of_weekend_nights"] + booking_data["no_of_week_nights"]
-            
-            booking = Booking(**booking_data)
-            db.add(booking)
+        # Create synthetic bookings following the training-data distributions
+        print(f"Creating {SEED_BOOKINGS} sample bookings (seed {SEED})...")
+        rng = np.random.default_rng(SEED)
+        user_ids = np.array([user.id for user in db.query(User).filter(User.role == "USER")])
+        seed_bookings(db, SEED_BOOKINGS, user_ids, rooms, rng)
         
         db.commit()
+        print(f"Scored {score_unscored_bookings(db)} active bookings")
         print("Database initialized successfully!")
         
         # Print account information
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import threading
+from typing import Callable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single process, so it is always the leader
+    fcntl = None
+
+# Background jobs (rescoring, deferred scoring) run in one worker per host; the
+# worker holding this lock is the leader until it exits and the OS releases it
+BACKGROUND_JOBS_LOCK = os.getenv("BACKGROUND_JOBS_LOCK", os.path.join(tempfile.gettempdir(), "hotel-background-jobs.lock"))
+LEADER_RETRY_SECONDS = int(os.getenv("LEADER_RETRY_SECONDS", 30))
+
+_lock_file = None
+_stop_event = threading.Event()
+
+def try_become_leader(path: str = BACKGROUND_JOBS_LOCK) -> bool:
+    """Take the background-jobs lock without blocking; the lock is held for the life of the process"""
+    global _lock_file
+    if _lock_file is not None:
+        return True
+    if fcntl is None:
+        _lock_file = True
+        return True
+
+    lock_file = open(path, "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    _lock_file = lock_file
+    return True
+
+def is_leader() -> bool:
+    """Whether this process holds the background-jobs lock"""
+    return _lock_file is not None
+
+def _wait_for_leadership(stop_event: threading.Event, interval: int, on_elected: Callable[[], None]):
+    """Retry the lock every `interval` seconds so another worker takes over when the leader exits"""
+    while not stop_event.wait(interval):
+        if try_become_leader():
+            print(f"Worker {os.getpid()} took over background jobs")
+            on_elected()
+            return
+
+def run_as_leader(on_elected: Callable[[], None], retry_seconds: int = LEADER_RETRY_SECONDS) -> Optional[threading.Thread]:
+    """Call on_elected now if this process is the leader, otherwise once it becomes one"""
+    _stop_event.clear()
+    if try_become_leader():
+        on_elected()
+        return None
+    if retry_seconds <= 0:
+        return None
+
+    thread = threading.Thread(target=_wait_for_leadership, args=(_stop_event, retry_seconds, on_elected), daemon=True, name="leader-election")
+    thread.start()
+    return thread
+
+def stop_leader_election():
+    """Stop waiting for leadership (the lock itself is released when the process exits)"""
+    _stop_event.set()
@@ -0,0 +1,168 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, Booking
+from schemas import PredictionRequest, PredictionResponse
+from ml_model import predictor
+from metrics import CIRCUIT_STATE, BOOKING_SCORING, INFERENCE_QUEUE_DEPTH, PENDING_PREDICTIONS
+from rescoring import iter_booking_frames, store_predictions
+
+# Latency budget for scoring inside POST /bookings
+INFERENCE_DEADLINE_MS = float(os.getenv("INFERENCE_DEADLINE_MS", 250))
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", 2))
+# Scoring calls allowed to wait for a worker before new bookings are deferred
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", 8))
+
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 5))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", 30))
+
+PENDING_SCORE_INTERVAL_SECONDS = int(os.getenv("PENDING_SCORE_INTERVAL_SECONDS", 5))
+PENDING_SCORE_BATCH_SIZE = int(os.getenv("PENDING_SCORE_BATCH_SIZE", 500))
+
+class CircuitBreaker:
+    """Stop sending bookings to the model after repeated failures, then let one trial call through"""
+    STATES = ("closed", "half_open", "open")
+
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD, reset_seconds: float = CIRCUIT_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+        self._set_state("closed")
+
+    def _set_state(self, state: str):
+        self.state = state
+        CIRCUIT_STATE.set(self.STATES.index(state))
+
+    def allow(self) -> bool:
+        """Whether a call may go to the model now"""
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.reset_seconds:
+                    return False
+                self._set_state("half_open")
+                self._trial_running = False
+            if self.state == "half_open":
+                # Only one trial call at a time while the model is on probation
+                if self._trial_running:
+                    return False
+                self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._trial_running = False
+            if self.state != "closed":
+                self._set_state("closed")
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._set_state("open")
+
+breaker = CircuitBreaker()
+
+_executor = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="inference")
+_slots = threading.BoundedSemaphore(INFERENCE_WORKERS + INFERENCE_QUEUE_SIZE)
+
+def _release_slot(_future):
+    _slots.release()
+    INFERENCE_QUEUE_DEPTH.dec()
+
+def _defer(reason: str) -> None:
+    BOOKING_SCORING.labels(reason).inc()
+    return None
+
+def score_booking(request: PredictionRequest, deadline_ms: float = INFERENCE_DEADLINE_MS) -> Optional[PredictionResponse]:
+    """Score a new booking within the latency budget, or return None to leave it pending"""
+    if predictor.model is None or predictor.scaler is None:
+        return _defer("no_model")
+
+    # A full queue means scoring is already behind; don't add to it
+    if not _slots.acquire(blocking=False):
+        return _defer("queue_full")
+    INFERENCE_QUEUE_DEPTH.inc()
+    if not breaker.allow():
+        _release_slot(None)
+        return _defer("circuit_open")
+
+    future = _executor.submit(predictor.predict, request)
+    # The slot stays taken until the model call returns, even if this request stops waiting
+    future.add_done_callback(_release_slot)
+    try:
+        prediction = future.result(timeout=deadline_ms / 1000)
+    except FutureTimeout:
+        breaker.record_failure()
+        return _defer("deadline")
+
+    # predict() reports its own errors as an "Unknown" risk level
+    if prediction.risk_level == "Unknown":
+        breaker.record_failure()
+        return _defer("error")
+
+    breaker.record_success()
+    BOOKING_SCORING.labels("scored").inc()
+    return prediction
+
+def score_pending_bookings(db: Session, batch_size: int = PENDING_SCORE_BATCH_SIZE) -> dict:
+    """Fill in predictions for active bookings that were committed as pending"""
+    criteria = (Booking.prediction_status == "pending", Booking.status == "Active")
+    pending = db.execute(select(func.count()).select_from(Booking).where(*criteria)).scalar()
+    PENDING_PREDICTIONS.set(pending)
+    if pending == 0 or predictor.model is None or predictor.scaler is None or not breaker.allow():
+        return {"pending_bookings": pending, "scored_bookings": 0}
+
+    scored = 0
+    try:
+        for frame in iter_booking_frames(db, *criteria, batch_size=batch_size):
+            store_predictions(db, frame, predictor.predict_batch(frame))
+            scored += len(frame)
+    except Exception:
+        db.rollback()
+        breaker.record_failure()
+        raise
+    breaker.record_success()
+
+    PENDING_PREDICTIONS.set(max(pending - scored, 0))
+    return {"pending_bookings": pending, "scored_bookings": scored}
+
+def _score_pending_loop(stop_event: threading.Event, interval: int):
+    """Score pending bookings every `interval` seconds until stopped"""
+    while not stop_event.wait(interval):
+        db = SessionLocal()
+        try:
+            result = score_pending_bookings(db)
+            if result["scored_bookings"]:
+                print(f"Deferred scoring: {result['scored_bookings']} of {result['pending_bookings']} pending bookings scored")
+        except Exception as e:
+            print(f"Deferred scoring error: {e}")
+        finally:
+            db.close()
+
+_stop_event = threading.Event()
+
+def start_pending_scorer(interval: int = PENDING_SCORE_INTERVAL_SECONDS) -> Optional[threading.Thread]:
+    """Start the background thread that scores pending bookings (disabled when interval is 0)"""
+    if interval <= 0:
+        return None
+
+    _stop_event.clear()
+    thread = threading.Thread(target=_score_pending_loop, args=(_stop_event, interval), daemon=True, name="pending-scorer")
+    thread.start()
+    return thread
+
+def stop_pending_scorer():
+    """Signal the pending scoring thread to stop"""
+    _stop_event.set()
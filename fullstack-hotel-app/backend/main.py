@@ -1,25 +1,60 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, OAuth2PasswordRequestForm
+from fastapi.responses import Response, PlainTextResponse, StreamingResponse
+from fastapi.routing import APIRoute
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from anyio import to_thread
+import os
 import uvicorn
 from datetime import timedelta, datetime
 
 # Import our modules
-from database import get_db, create_tables, User, Room, Booking
+from database import (
+    get_db, get_read_db, create_tables, engine, read_engine, READ_TARGET,
+    User, Room, Booking, bookings_all
+)
 from schemas import (
     UserCreate, UserUpdate, User as UserSchema, Token,
     RoomCreate, Room as RoomSchema,
     BookingCreate, Booking as BookingSchema,
     PredictionRequest, PredictionResponse,
-    BookingStats, MonthlyTrend, RoomTypeStats
+    BookingStats, MonthlyTrend, RoomTypeStats, BookingExplanation
 )
 from auth import (
     authenticate_user, create_access_token, get_password_hash,
-    get_current_active_user, get_current_admin_user, ACCESS_TOKEN_EXPIRE_MINUTES
+    get_current_active_user, get_current_admin_user, get_event_stream_admin_user, require_metrics_access,
+    create_event_ticket, ACCESS_TOKEN_EXPIRE_MINUTES, EVENT_TICKET_EXPIRE_SECONDS
+)
+from ml_model import predictor, start_model_watcher, stop_model_watcher
+from metrics import MetricsMiddleware, CONTENT_TYPE, instrument_engine, render_metrics
+from profiling import (
+    PROFILING_ENABLED, ProfilingMiddleware, sample_for, start_route_profile,
+    current_route_profile, slow_queries
+)
+from compression import CompressionMiddleware
+from http_cache import conditional_response, booking_history_validators, user_list_validators
+from serialization import (
+    FAST_JSON_RESPONSES, serialize_booking, booking_history_rows, booking_history_response, user_list_response
 )
-from ml_model import predictor
+from rescoring import (
+    iter_booking_frames, store_predictions, rescore_active_bookings, lead_time_bucket,
+    start_rescore_scheduler, stop_rescore_scheduler
+)
+from events import HIGH_RISK_THRESHOLD, event_hub, publish_stats_delta, start_event_relay, stop_event_relay
+from rate_limit import rate_limit
+from archive import ARCHIVE_HORIZON_DAYS, archive_bookings, user_booking_history
+from explanations import booking_explanation
+from load_shedding import score_booking, start_pending_scorer, stop_pending_scorer
+from leader import run_as_leader, stop_leader_election
+from idempotency import IdempotentRequest, purge_expired_keys
+
+# server.py creates tables and seeds the admin once in the master process and sets this for its workers
+SKIP_STARTUP_DB_INIT = os.getenv("SKIP_STARTUP_DB_INIT", "false").lower() == "true"
+# Worker threads for sync routes and dependencies (0 keeps AnyIO's default of 40)
+THREADPOOL_TOKENS = int(os.getenv("THREADPOOL_TOKENS", 0))
 
 # Create FastAPI app
 app = FastAPI(title="Hotel Booking System API", version="1.0.0")
@@ -39,9 +74,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Create tables on startup
-@app.on_event("startup")
-def startup_event():
+# Brotli/gzip for large responses
+app.add_middleware(CompressionMiddleware)
+
+# Request counting for armed route profiles
+app.add_middleware(ProfilingMiddleware)
+
+# Request latency, status and per-request DB usage
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine)
+if read_engine is not engine:
+    instrument_engine(read_engine, READ_TARGET)
+
+def init_database():
+    """Create tables, the admin user and the default rooms if missing"""
     create_tables()
     # Add initial data if needed
     db = next(get_db())
@@ -70,10 +116,43 @@ def startup_event():
         db.add_all(default_rooms)
         db.commit()
     
+    # Stored Idempotency-Key responses past their TTL or whose booking was deleted
+    purge_expired_keys(db)
     db.close()
 
+def start_background_jobs():
+    # Periodically refresh lead times and predictions of active bookings
+    start_rescore_scheduler()
+    # Fill in predictions of bookings committed while the model was slow or unavailable
+    start_pending_scorer()
+
+# Create tables on startup
+@app.on_event("startup")
+def startup_event():
+    if not SKIP_STARTUP_DB_INIT:
+        init_database()
+    
+    if THREADPOOL_TOKENS > 0:
+        to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_TOKENS
+    
+    # With several workers only the one holding the lock runs the schedulers
+    run_as_leader(start_background_jobs)
+    # Every worker serves its own copy of the model, so each one watches for new versions
+    start_model_watcher()
+    # Every worker streams events to its own clients, so each one relays the shared ones
+    start_event_relay()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    stop_leader_election()
+    stop_rescore_scheduler()
+    stop_pending_scorer()
+    stop_model_watcher()
+    stop_event_relay()
+    event_hub.close()
+
 # Auth endpoints
-@app.post("/auth/register", response_model=UserSchema)
+@app.post("/auth/register", response_model=UserSchema, dependencies=[Depends(rate_limit("auth"))])
 def register(user: UserCreate, db: Session = Depends(get_db)):
     """Register a new user"""
     # Check if user already exists
@@ -97,7 +176,7 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
     
     return db_user
 
-@app.post("/auth/login", response_model=Token)
+@app.post("/auth/login", response_model=Token, dependencies=[Depends(rate_limit("auth"))])
 def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     """Login user and return JWT token"""
     user = authenticate_user(db, form_data.username, form_data.password)
@@ -136,8 +215,8 @@ def update_user_profile(
     return current_user
 
 # Room endpoints
-@app.get("/rooms", response_model=List[RoomSchema])
-def get_rooms(db: Session = Depends(get_db)):
+@app.get("/rooms", response_model=List[RoomSchema], dependencies=[Depends(rate_limit("reads"))])
+def get_rooms(db: Session = Depends(get_read_db)):
     """Get all available rooms"""
     return db.query(Room).all()
 
@@ -158,10 +237,19 @@ def create_room(
 @app.post("/bookings", response_model=BookingSchema)
 def create_booking(
     booking: BookingCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Create a new booking"""
+    # Retries carrying the same Idempotency-Key get the stored response; duplicates in flight wait for the first
+    with IdempotentRequest(db, current_user.id, idempotency_key, booking.model_dump()) as idempotent:
+        if idempotent.replay is not None:
+            return idempotent.replay
+        return _create_booking(booking, current_user, db, idempotent)
+
+def _create_booking(booking: BookingCreate, current_user: User, db: Session, idempotent: IdempotentRequest):
+    """Room check, history, scoring and inventory update for one new booking"""
     from datetime import datetime, date
     
     # Get room details
@@ -172,11 +260,9 @@ def create_booking(
     if room.available_rooms <= 0:
         raise HTTPException(status_code=400, detail="No rooms available")
     
-    # Get user's booking history for repeated guest and previous bookings
-    user_bookings = db.query(Booking).filter(Booking.user_id == current_user.id).all()
-    repeated_guest = len(user_bookings) > 0
-    no_of_previous_cancellations = len([b for b in user_bookings if b.status == "Cancelled"])
-    no_of_previous_bookings_not_cancelled = len([b for b in user_bookings if b.status == "Completed"])
+    # Get user's booking history for repeated guest and previous bookings, including archived ones
+    total_bookings, no_of_previous_cancellations, no_of_previous_bookings_not_cancelled = user_booking_history(db, current_user.id)
+    repeated_guest = total_bookings > 0
     
     # Calculate derived fields
     no_of_individuals = booking.no_of_adults + booking.no_of_children
@@ -199,8 +285,9 @@ def create_booking(
         avg_price_per_room=room.price
     )
     
-    # Get prediction
-    prediction = predictor.predict(prediction_request)
+    # Score within the latency budget; if the model is slow, busy or down the booking
+    # is committed as pending and the background scorer fills the prediction in
+    prediction = score_booking(prediction_request)
     
     # Create booking with proper date object
     booking_dict = booking.dict(exclude={'booking_date'})
@@ -214,7 +301,9 @@ def create_booking(
         avg_price_per_room=room.price,
         no_of_individuals=no_of_individuals,
         no_of_days_booked=no_of_days_booked,
-        cancellation_prediction=prediction.cancellation_probability,
+        lead_time_bucket=int(lead_time_bucket(booking.lead_time)),
+        cancellation_prediction=prediction.cancellation_probability if prediction else None,
+        prediction_status="scored" if prediction else "pending",
         status="Active"
     )
     
@@ -222,18 +311,42 @@ def create_booking(
     room.available_rooms -= 1
     
     db.add(db_booking)
-    db.commit()
-    db.refresh(db_booking)
+    db.flush()
+    
+    # Commits the booking together with the response stored for retries
+    payload = serialize_booking(db, db_booking.id)
+    response = idempotent.respond(payload, booking_id=db_booking.id)
+    
+    # Push the change to dashboards instead of having them poll
+    event_hub.publish("booking.created", {"booking": payload})
+    publish_stats_delta(
+        {
+            "total_bookings": 1,
+            "active_bookings": 1,
+            "high_risk_bookings": int(prediction is not None and prediction.cancellation_probability >= HIGH_RISK_THRESHOLD),
+        },
+        monthly_trends={booking.arrival_month: 1},
+        room_types={booking.room_type_reserved: 1},
+    )
     
-    return db_booking
+    return response
 
-@app.get("/bookings/me", response_model=List[BookingSchema])
+@app.get("/bookings/me", response_model=List[BookingSchema], dependencies=[Depends(rate_limit("reads"))])
 def get_my_bookings(
+    request: Request,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    """Get current user's bookings"""
-    return db.query(Booking).filter(Booking.user_id == current_user.id).all()
+    """Get current user's bookings, including archived ones"""
+    criteria = bookings_all.c.user_id == current_user.id
+    if FAST_JSON_RESPONSES:
+        return conditional_response(
+            request,
+            booking_history_validators(db, f"user:{current_user.id}", criteria),
+            lambda: booking_history_response(db, criteria),
+            cache="bookings_me"
+        )
+    return booking_history_rows(db, criteria)
 
 @app.put("/bookings/{booking_id}/cancel")
 def cancel_booking(
@@ -262,35 +375,76 @@ def cancel_booking(
         room.available_rooms += 1
     
     db.commit()
+    
+    event_hub.publish("booking.cancelled", {"booking_id": booking.id, "status": booking.status})
+    was_high_risk = booking.cancellation_prediction is not None and booking.cancellation_prediction >= HIGH_RISK_THRESHOLD
+    publish_stats_delta({"active_bookings": -1, "cancelled_bookings": 1, "high_risk_bookings": -int(was_high_risk)})
+    
     return {"message": "Booking cancelled successfully"}
 
 # Admin endpoints
-@app.get("/admin/bookings", response_model=List[BookingSchema])
+@app.get("/admin/bookings", response_model=List[BookingSchema], dependencies=[Depends(rate_limit("reads"))])
 def get_all_bookings(
+    request: Request,
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_read_db)
+):
+    """Get all bookings, including archived ones (Admin only)"""
+    if FAST_JSON_RESPONSES:
+        return conditional_response(
+            request,
+            booking_history_validators(db, "all"),
+            lambda: booking_history_response(db),
+            cache="admin_bookings"
+        )
+    return booking_history_rows(db)
+
+@app.get("/admin/bookings/{booking_id}/explain", response_model=BookingExplanation, dependencies=[Depends(rate_limit("reads"))])
+def explain_booking(
+    booking_id: int,
     current_user: User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
-    """Get all bookings (Admin only)"""
-    return db.query(Booking).all()
+    """Per-feature contributions to a booking's cancellation prediction (Admin only)"""
+    booking = db.query(Booking).filter(Booking.id == booking_id).first()
+    if not booking:
+        raise HTTPException(status_code=404, detail="Booking not found")
+    if predictor.model is None or predictor.scaler is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    
+    # Stored explanations are served as-is; one is computed only if missing or from an older model
+    return booking_explanation(db, booking)
 
-@app.get("/admin/users", response_model=List[UserSchema])
+@app.get("/admin/users", response_model=List[UserSchema], dependencies=[Depends(rate_limit("reads"))])
 def get_all_users(
+    request: Request,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get all users (Admin only)"""
+    if FAST_JSON_RESPONSES:
+        return conditional_response(
+            request,
+            user_list_validators(db),
+            lambda: user_list_response(db),
+            cache="admin_users"
+        )
     return db.query(User).all()
 
-@app.get("/admin/analytics/stats", response_model=BookingStats)
+@app.get("/admin/analytics/stats", response_model=BookingStats, dependencies=[Depends(rate_limit("reads"))])
 def get_booking_stats(
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get booking statistics (Admin only)"""
-    total_bookings = db.query(Booking).count()
+    # Finished bookings may have been archived, so status totals come from the full history
+    status_counts = dict(db.execute(
+        select(bookings_all.c.status, func.count()).group_by(bookings_all.c.status)
+    ).all())
+    total_bookings = sum(status_counts.values())
     active_bookings = db.query(Booking).filter(Booking.status == "Active").count()
-    cancelled_bookings = db.query(Booking).filter(Booking.status == "Cancelled").count()
-    completed_bookings = db.query(Booking).filter(Booking.status == "Completed").count()
+    cancelled_bookings = status_counts.get("Cancelled", 0)
+    completed_bookings = status_counts.get("Completed", 0)
     high_risk_bookings = db.query(Booking).filter(
         Booking.cancellation_prediction >= 0.7,
         Booking.status == "Active"
@@ -304,33 +458,33 @@ def get_booking_stats(
         high_risk_bookings=high_risk_bookings
     )
 
-@app.get("/admin/analytics/monthly-trends", response_model=List[MonthlyTrend])
+@app.get("/admin/analytics/monthly-trends", response_model=List[MonthlyTrend], dependencies=[Depends(rate_limit("reads"))])
 def get_monthly_trends(
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get monthly booking trends (Admin only)"""
-    results = db.query(Booking.arrival_month, db.func.count(Booking.id).label('count'))\
-                .group_by(Booking.arrival_month)\
-                .order_by(Booking.arrival_month)\
+    results = db.query(bookings_all.c.arrival_month, func.count(bookings_all.c.id).label('count'))\
+                .group_by(bookings_all.c.arrival_month)\
+                .order_by(bookings_all.c.arrival_month)\
                 .all()
     
     return [MonthlyTrend(month=month, count=count) for month, count in results]
 
-@app.get("/admin/analytics/room-types", response_model=List[RoomTypeStats])
+@app.get("/admin/analytics/room-types", response_model=List[RoomTypeStats], dependencies=[Depends(rate_limit("reads"))])
 def get_room_type_stats(
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get room type statistics (Admin only)"""
-    results = db.query(Booking.room_type_reserved, db.func.count(Booking.id).label('count'))\
-                .group_by(Booking.room_type_reserved)\
+    results = db.query(bookings_all.c.room_type_reserved, func.count(bookings_all.c.id).label('count'))\
+                .group_by(bookings_all.c.room_type_reserved)\
                 .all()
     
     return [RoomTypeStats(room_type=room_type, count=count) for room_type, count in results]
 
 # Prediction endpoint
-@app.post("/predict", response_model=PredictionResponse)
+@app.post("/predict", response_model=PredictionResponse, dependencies=[Depends(rate_limit("inference"))])
 def predict_cancellation(
     request: PredictionRequest,
     current_user: User = Depends(get_current_admin_user)
@@ -338,62 +492,150 @@ def predict_cancellation(
     """Predict booking cancellation (Admin only)"""
     return predictor.predict(request)
 
-@app.post("/admin/predict-all-bookings")
+@app.post("/admin/predict-all-bookings", dependencies=[Depends(rate_limit("admin_bulk"))])
 def predict_all_bookings(
     current_user: User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """Predict cancellation for all active bookings (Admin only)"""
-    # Get all active bookings
-    active_bookings = db.query(Booking).filter(Booking.status == "Active").all()
+    # Rather than overwrite every score with the 0.5 fallback; the dashboard shows the detail
+    if predictor.model is None or predictor.scaler is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
     
+    total_bookings = db.execute(select(func.count(Booking.id)).where(Booking.status == "Active")).scalar()
+    
+    # Stream feature columns in batches and commit each one, so memory stays flat however many bookings are active
     updated_count = 0
-    for booking in active_bookings:
+    for frame in iter_booking_frames(db, Booking.status == "Active"):
         try:
-            # Create prediction request from booking data
-            prediction_request = PredictionRequest(
-                no_of_adults=booking.no_of_adults,
-                no_of_children=booking.no_of_children,
-                no_of_weekend_nights=booking.no_of_weekend_nights,
-                no_of_week_nights=booking.no_of_week_nights,
-                type_of_meal_plan=booking.type_of_meal_plan,
-                required_car_parking_space=booking.required_car_parking_space,
-                room_type_reserved=booking.room_type_reserved,
-                lead_time=booking.lead_time,
-                arrival_year=booking.arrival_year,
-                arrival_month=booking.arrival_month,
-                arrival_date=booking.arrival_date,
-                market_segment_type=booking.market_segment_type,
-                repeated_guest=booking.repeated_guest,
-                no_of_previous_cancellations=booking.no_of_previous_cancellations,
-                no_of_previous_bookings_not_cancelled=booking.no_of_previous_bookings_not_cancelled,
-                avg_price_per_room=booking.avg_price_per_room,
-                no_of_special_requests=booking.no_of_special_requests
-            )
-            
-            # Get prediction
-            prediction = predictor.predict(prediction_request)
-            
-            # Update booking with prediction
-            booking.cancellation_prediction = prediction.cancellation_probability
-            updated_count += 1
-            
+            store_predictions(db, frame, predictor.predict_batch(frame))
+            updated_count += len(frame)
         except Exception as e:
-            print(f"Error predicting for booking {booking.id}: {e}")
+            db.rollback()
+            print(f"Error predicting for bookings {frame['id'].iloc[0]}-{frame['id'].iloc[-1]}: {e}")
             continue
     
-    db.commit()
-    
     return {
         "message": f"Predictions updated for {updated_count} bookings",
-        "total_bookings": len(active_bookings),
+        "total_bookings": total_bookings,
         "updated_bookings": updated_count
     }
 
+@app.post("/admin/rescore-bookings", dependencies=[Depends(rate_limit("admin_bulk"))])
+def rescore_bookings(
+    force: bool = False,
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Refresh lead times and rescore active bookings whose lead-time bucket changed (Admin only)"""
+    result = rescore_active_bookings(db, force=force)
+    
+    return {
+        "message": f"Predictions updated for {result['rescored_bookings']} bookings",
+        "total_bookings": result["active_bookings"],
+        "updated_bookings": result["rescored_bookings"]
+    }
+
+# Archive endpoints
+@app.post("/admin/archive-bookings", dependencies=[Depends(rate_limit("admin_bulk"))])
+def archive_old_bookings(
+    # Bookings only become archivable once their arrival date is past
+    horizon_days: Optional[int] = Query(None, ge=1),
+    max_batches: Optional[int] = None,
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Move completed and cancelled bookings past the archive horizon out of the live table (Admin only)"""
+    result = archive_bookings(
+        db,
+        horizon_days=horizon_days if horizon_days is not None else ARCHIVE_HORIZON_DAYS,
+        max_batches=max_batches
+    )
+    
+    return {
+        "message": f"Archived {result['archived_bookings']} bookings",
+        **result
+    }
+
+# Profiling endpoints
+def require_profiling_enabled():
+    """Hide profiling endpoints unless PROFILING_ENABLED is set"""
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+
+@app.post("/admin/profiling/sample", response_class=PlainTextResponse, dependencies=[Depends(require_profiling_enabled)])
+def profile_sample(
+    seconds: float = 5.0,
+    interval_ms: float = 5.0,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Sample all threads for N seconds and return collapsed stacks (Admin only)"""
+    sampler = sample_for(seconds, interval=interval_ms / 1000)
+    return sampler.collapsed()
+
+@app.post("/admin/profiling/route", dependencies=[Depends(require_profiling_enabled)])
+def profile_route(
+    route: str,
+    requests: int = 10,
+    method: str = "GET",
+    interval_ms: float = 5.0,
+    max_seconds: float = 300,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Profile the next N requests to a route (Admin only)"""
+    target = next(
+        (r for r in app.routes if isinstance(r, APIRoute) and r.path == route and method.upper() in r.methods),
+        None
+    )
+    if target is None:
+        raise HTTPException(status_code=404, detail="Route not found")
+    
+    profile = start_route_profile(target, requests, interval=interval_ms / 1000, max_seconds=max_seconds)
+    return profile.status()
+
+@app.get("/admin/profiling/route", dependencies=[Depends(require_profiling_enabled)])
+def get_route_profile(current_user: User = Depends(get_current_admin_user)):
+    """Get the status and collapsed stacks of the last route profile (Admin only)"""
+    profile = current_route_profile()
+    if profile is None:
+        raise HTTPException(status_code=404, detail="No route profile has been started")
+    return profile.status()
+
+@app.get("/admin/profiling/slow-queries", dependencies=[Depends(require_profiling_enabled)])
+def get_slow_queries(current_user: User = Depends(get_current_admin_user)):
+    """Get recent SQL statements slower than SLOW_QUERY_MS (Admin only)"""
+    return list(slow_queries)
+
+@app.post("/admin/events/ticket")
+def admin_events_ticket(current_user: User = Depends(get_current_admin_user)):
+    """Issue a short-lived ticket for opening the event stream with EventSource (Admin only)"""
+    return {"ticket": create_event_ticket(current_user.email), "expires_in": EVENT_TICKET_EXPIRE_SECONDS}
+
+@app.get("/admin/events")
+async def admin_events(
+    request: Request,
+    last_event_id: Optional[str] = None,
+    current_user: User = Depends(get_event_stream_admin_user)
+):
+    """Stream booking, prediction and stats changes as server-sent events (Admin only)"""
+    # A client reconnecting with a new ticket opens a new EventSource, which can't send Last-Event-ID itself
+    subscription = event_hub.subscribe(request.headers.get("last-event-id") or last_event_id)
+    return StreamingResponse(
+        event_hub.stream(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_access)])
+async def metrics():
+    """Prometheus metrics in text exposition format"""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
+
 @app.get("/")
 def read_root():
     """Health check endpoint"""
     return {"message": "Hotel Booking System API", "status": "running"}
 
 if __name__ == "__main__":
+    # Single process for development; use server.py for multiple workers
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,346 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """Render a label set in exposition format"""
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+def _format_value(value: float) -> str:
+    """Render a sample value in exposition format"""
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def set(self, value: float):
+        self.value = value
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+class _Timer:
+    __slots__ = ("_child", "_start")
+
+    def __init__(self, child: _HistogramChild):
+        self._child = child
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._child.observe(time.perf_counter() - self._start)
+
+class _Metric:
+    """Base class for a named metric family with optional labels"""
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Return the child metric for a set of label values"""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+            for key, child in list(self._children.items())
+        ]
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def time(self) -> _Timer:
+        return self.labels().time()
+
+    def _samples(self) -> List[str]:
+        lines = []
+        labelnames = self.labelnames + ("le",)
+        for key, child in list(self._children.items()):
+            with child._lock:
+                counts = list(child.counts)
+                total, count = child.sum, child.count
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(labelnames, key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class Registry:
+    """Collection of metric families rendered on /metrics"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: _Metric):
+        self._metrics.append(metric)
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Register a callback that refreshes gauges right before rendering"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                print(f"Metrics collector error: {e}")
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+REGISTRY = Registry()
+
+# Request path
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency by route", ("method", "route"))
+HTTP_IN_PROGRESS = Gauge("http_requests_in_progress", "HTTP requests currently being served")
+
+# Database
+DB_SESSIONS = Counter("db_sessions_total", "Sessions opened by target (primary, read_only or replica)", ("target",))
+DB_QUERIES = Counter("db_queries_total", "SQL statements executed by target", ("target",))
+DB_QUERY_LATENCY = Histogram("db_query_duration_seconds", "SQL statement execution time by target", ("target",))
+DB_QUERIES_PER_REQUEST = Histogram("db_queries_per_request", "SQL statements issued per HTTP request", ("route",), buckets=COUNT_BUCKETS)
+DB_TIME_PER_REQUEST = Histogram("db_time_per_request_seconds", "Time spent in SQL per HTTP request", ("route",))
+
+# Model
+INFERENCE_STAGE_LATENCY = Histogram("inference_stage_duration_seconds", "Inference time by stage", ("stage",))
+INFERENCE_ROWS = Counter("inference_rows_total", "Bookings scored by the model", ("mode",))
+MODEL_LOAD_SECONDS = Gauge("model_load_seconds", "Time taken by the last model load")
+MODEL_LOADED = Gauge("model_loaded", "Whether a model and scaler are loaded")
+MODEL_ERRORS = Counter("model_errors_total", "Model load and prediction errors", ("kind",))
+
+# Booking-path load shedding
+BOOKING_SCORING = Counter("booking_scoring_total", "New bookings scored inline or deferred, by outcome (scored or the deferral reason)", ("outcome",))
+CIRCUIT_STATE = Gauge("inference_circuit_state", "Model circuit breaker state (0 closed, 1 half-open, 2 open)")
+INFERENCE_QUEUE_DEPTH = Gauge("inference_queue_depth", "Booking scoring calls running or waiting for an inference worker")
+IDEMPOTENCY_REQUESTS = Counter("idempotency_requests_total", "Requests with an Idempotency-Key by outcome (claimed, replayed, replayed_waited, in_progress, mismatch)", ("outcome",))
+PENDING_PREDICTIONS = Gauge("pending_predictions", "Active bookings waiting for a deferred prediction")
+
+# Threadpool used for sync routes and dependencies
+THREADPOOL_SIZE = Gauge("threadpool_tokens_total", "Worker threads available to sync routes")
+THREADPOOL_BUSY = Gauge("threadpool_tokens_borrowed", "Worker threads currently in use")
+
+# Caches
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups by cache and result", ("cache", "result"))
+
+# Server-sent events
+EVENT_SUBSCRIBERS = Gauge("event_subscribers", "Open event stream connections")
+EVENTS_PUBLISHED = Counter("events_published_total", "Events published to the event hub", ("type",))
+EVENTS_DROPPED = Counter("events_dropped_total", "Events dropped because a subscriber fell behind")
+
+# Admission control
+RATE_LIMIT_REJECTIONS = Counter("rate_limit_rejections_total", "Requests rejected by route class and reason", ("route_class", "reason"))
+ADMISSION_IN_FLIGHT = Gauge("admission_in_flight", "Admitted requests currently running by route class", ("route_class",))
+
+def record_cache(cache: str, hit: bool):
+    """Count a cache lookup"""
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+class RequestContext:
+    """Per-request accumulator shared with the threadpool through a context variable"""
+    __slots__ = ("scope", "query_count", "query_time")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.query_count = 0
+        self.query_time = 0.0
+
+    @property
+    def route(self) -> str:
+        route = self.scope.get("route")
+        return route.path if route is not None else "unmatched"
+
+request_context: ContextVar[Optional[RequestContext]] = ContextVar("request_context", default=None)
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and DB usage per route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        context = RequestContext(scope)
+        token = request_context.set(context)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_PROGRESS.labels().inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_PROGRESS.labels().dec()
+            request_context.reset(token)
+
+            route = context.route
+            method = scope["method"]
+            HTTP_REQUESTS.labels(method, route, status_code).inc()
+            HTTP_LATENCY.labels(method, route).observe(elapsed)
+            DB_QUERIES_PER_REQUEST.labels(route).observe(context.query_count)
+            DB_TIME_PER_REQUEST.labels(route).observe(context.query_time)
+
+# Callbacks invoked with (statement, elapsed seconds, request context) after each query
+_query_listeners: List[Callable[[str, float, Optional[RequestContext]], None]] = []
+
+def add_query_listener(listener: Callable[[str, float, Optional[RequestContext]], None]):
+    """Register a callback that runs after every instrumented SQL statement"""
+    _query_listeners.append(listener)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the statement's own execution context, so a statement that fails leaves nothing behind
+    context._query_start_time = time.perf_counter()
+
+def _record_query(context, statement, target: str):
+    elapsed = time.perf_counter() - context._query_start_time
+    DB_QUERIES.labels(target).inc()
+    DB_QUERY_LATENCY.labels(target).observe(elapsed)
+
+    current = request_context.get()
+    if current is not None:
+        current.query_count += 1
+        current.query_time += elapsed
+
+    for listener in _query_listeners:
+        listener(statement, elapsed, current)
+
+def instrument_engine(engine, target: str = "primary"):
+    """Attach query count/time hooks to a SQLAlchemy engine, labelled with its target"""
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        _record_query(context, statement, target)
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+def _collect_threadpool():
+    from anyio import to_thread
+
+    limiter = to_thread.current_default_thread_limiter()
+    THREADPOOL_SIZE.set(limiter.total_tokens)
+    THREADPOOL_BUSY.set(limiter.borrowed_tokens)
+
+def render_metrics() -> str:
+    """Render all metrics (must be called from the event loop for threadpool gauges)"""
+    return REGISTRY.render()
+
+REGISTRY.add_collector(_collect_threadpool)
@@ -1,57 +1,166 @@
+import hashlib
+import os
 import pickle
+import threading
+import time
 import numpy as np
 import pandas as pd
-from typing import List
+from typing import List, Optional, Tuple
 from schemas import PredictionRequest, PredictionResponse
+from metrics import INFERENCE_STAGE_LATENCY, INFERENCE_ROWS, MODEL_LOAD_SECONDS, MODEL_LOADED, MODEL_ERRORS
+
+# Published model versions live in MODELS_DIR/<version>/, with MODELS_DIR/CURRENT naming the live one
+MODELS_DIR = os.getenv("MODELS_DIR", "models")
+MODEL_RELOAD_INTERVAL_SECONDS = int(os.getenv("MODEL_RELOAD_INTERVAL_SECONDS", 60))
+
+# Map categorical features to numeric values
+MEAL_PLAN_MAPPING = {
+    'Meal Plan 1': 0,
+    'Meal Plan 2': 1,
+    'Meal Plan 3': 2,
+    'Not Selected': 3
+}
+
+ROOM_TYPE_MAPPING = {
+    'Room Type 1': 0,
+    'Room Type 2': 1,
+    'Room Type 3': 2,
+    'Room Type 4': 3,
+    'Room Type 5': 4,
+    'Room Type 6': 5,
+    'Room Type 7': 6
+}
+
+MARKET_SEGMENT_MAPPING = {
+    'Aviation': 0,
+    'Complementary': 1,
+    'Corporate': 2,
+    'Offline': 3,
+    'Online': 4
+}
+
+# Feature order used by the trained model
+FEATURE_COLUMNS = [
+    'no_of_adults',
+    'no_of_children',
+    'no_of_weekend_nights',
+    'no_of_week_nights',
+    'type_of_meal_plan',
+    'required_car_parking_space',
+    'room_type_reserved',
+    'lead_time',
+    'arrival_year',
+    'arrival_month',
+    'arrival_date',
+    'market_segment_type',
+    'repeated_guest',
+    'no_of_previous_cancellations',
+    'no_of_previous_bookings_not_cancelled',
+    'avg_price_per_room',
+    'no_of_special_requests',
+    'no_of_individuals',
+    'no_of_days_booked'
+]
+
+def risk_level_for(cancellation_prob: float) -> str:
+    """Map a cancellation probability to a risk level"""
+    if cancellation_prob >= 0.7:
+        return "High"
+    elif cancellation_prob >= 0.4:
+        return "Medium"
+    return "Low"
+
+def artifact_version(*paths: str) -> Optional[str]:
+    """Short content hash identifying a set of model artifacts"""
+    digest = hashlib.sha256()
+    try:
+        for path in paths:
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+    except OSError:
+        return None
+    return digest.hexdigest()[:12]
+
+def current_model_version(models_dir: str = MODELS_DIR) -> Optional[str]:
+    """Version named by the CURRENT pointer, if a model has been published"""
+    try:
+        with open(os.path.join(models_dir, "CURRENT")) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def published_artifacts(version: str, models_dir: str = MODELS_DIR) -> Tuple[str, str]:
+    """Model and scaler paths of a published version"""
+    directory = os.path.join(models_dir, version)
+    return os.path.join(directory, "model.pkl"), os.path.join(directory, "scaler.pkl")
+
+def _read_artifacts(model_path: str, scaler_path: str):
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+    with open(scaler_path, 'rb') as f:
+        scaler = pickle.load(f)
+    return model, scaler
 
 class MLPredictor:
-    def __init__(self, model_path: str = "model.pkl", scaler_path: str = "scaler.pkl"):
+    def __init__(self, model_path: str = "model.pkl", scaler_path: str = "scaler.pkl", models_dir: str = MODELS_DIR):
         """Initialize the ML predictor with model and scaler paths"""
-        self.model = None
-        self.scaler = None
+        self.models_dir = models_dir
+        # Model, scaler and version are swapped as one tuple so a reload never mixes them
+        self._artifacts = (None, None, None)
+        version = current_model_version(models_dir)
+        if version is not None:
+            model_path, scaler_path = published_artifacts(version, models_dir)
         self.load_model(model_path, scaler_path)
     
+    @property
+    def model(self):
+        return self._artifacts[0]
+    
+    @property
+    def scaler(self):
+        return self._artifacts[1]
+    
+    @property
+    def version(self) -> Optional[str]:
+        return self._artifacts[2]
+    
     def load_model(self, model_path: str, scaler_path: str):
         """Load the trained model and scaler"""
+        start = time.perf_counter()
         try:
-            with open(model_path, 'rb') as f:
-                self.model = pickle.load(f)
-            with open(scaler_path, 'rb') as f:
-                self.scaler = pickle.load(f)
+            model, scaler = _read_artifacts(model_path, scaler_path)
+            self._artifacts = (model, scaler, artifact_version(model_path, scaler_path))
             print("Model and scaler loaded successfully")
         except Exception as e:
             print(f"Error loading model: {e}")
-            self.model = None
-            self.scaler = None
+            MODEL_ERRORS.labels("load").inc()
+            self._artifacts = (None, None, None)
+        MODEL_LOAD_SECONDS.set(time.perf_counter() - start)
+        MODEL_LOADED.set(1 if self.model is not None and self.scaler is not None else 0)
+    
+    def reload_if_changed(self) -> bool:
+        """Load the published model if CURRENT points at a different version"""
+        version = current_model_version(self.models_dir)
+        if version is None or version == self.version:
+            return False
+        
+        start = time.perf_counter()
+        try:
+            model, scaler = _read_artifacts(*published_artifacts(version, self.models_dir))
+        except Exception as e:
+            # Keep serving the model already in memory
+            print(f"Error loading model version {version}: {e}")
+            MODEL_ERRORS.labels("load").inc()
+            return False
+        self._artifacts = (model, scaler, version)
+        MODEL_LOAD_SECONDS.set(time.perf_counter() - start)
+        MODEL_LOADED.set(1)
+        print(f"Loaded model version {version}")
+        return True
     
     def prepare_features(self, request: PredictionRequest) -> List[float]:
         """Prepare features for prediction"""
-        # Map categorical features to numeric values
-        meal_plan_mapping = {
-            'Meal Plan 1': 0,
-            'Meal Plan 2': 1,
-            'Meal Plan 3': 2,
-            'Not Selected': 3
-        }
-        
-        room_type_mapping = {
-            'Room Type 1': 0,
-            'Room Type 2': 1,
-            'Room Type 3': 2,
-            'Room Type 4': 3,
-            'Room Type 5': 4,
-            'Room Type 6': 5,
-            'Room Type 7': 6
-        }
-        
-        market_segment_mapping = {
-            'Aviation': 0,
-            'Complementary': 1,
-            'Corporate': 2,
-            'Offline': 3,
-            'Online': 4
-        }
-        
         # Calculate derived features
         no_of_individuals = request.no_of_adults + request.no_of_children
         no_of_days_booked = request.no_of_weekend_nights + request.no_of_week_nights
@@ -62,14 +171,14 @@ class MLPredictor:
             request.no_of_children,
             request.no_of_weekend_nights,
             request.no_of_week_nights,
-            meal_plan_mapping.get(request.type_of_meal_plan, 3),
+            MEAL_PLAN_MAPPING.get(request.type_of_meal_plan, 3),
             1 if request.required_car_parking_space else 0,
-            room_type_mapping.get(request.room_type_reserved, 0),
+            ROOM_TYPE_MAPPING.get(request.room_type_reserved, 0),
             request.lead_time,
             request.arrival_year,
             request.arrival_month,
             request.arrival_date,
-            market_segment_mapping.get(request.market_segment_type, 4),
+            MARKET_SEGMENT_MAPPING.get(request.market_segment_type, 4),
             1 if request.repeated_guest else 0,
             request.no_of_previous_cancellations,
             request.no_of_previous_bookings_not_cancelled,
@@ -81,9 +190,58 @@ class MLPredictor:
         
         return features
     
+    def prepare_feature_matrix(self, frame: pd.DataFrame) -> np.ndarray:
+        """Prepare features for a batch of bookings (one row per booking)"""
+        encoded = pd.DataFrame({
+            'no_of_adults': frame['no_of_adults'],
+            'no_of_children': frame['no_of_children'].fillna(0),
+            'no_of_weekend_nights': frame['no_of_weekend_nights'].fillna(0),
+            'no_of_week_nights': frame['no_of_week_nights'].fillna(0),
+            'type_of_meal_plan': frame['type_of_meal_plan'].map(MEAL_PLAN_MAPPING).fillna(3),
+            'required_car_parking_space': frame['required_car_parking_space'].fillna(False).astype(int),
+            'room_type_reserved': frame['room_type_reserved'].map(ROOM_TYPE_MAPPING).fillna(0),
+            'lead_time': frame['lead_time'].fillna(0),
+            'arrival_year': frame['arrival_year'],
+            'arrival_month': frame['arrival_month'],
+            'arrival_date': frame['arrival_date'],
+            'market_segment_type': frame['market_segment_type'].map(MARKET_SEGMENT_MAPPING).fillna(4),
+            'repeated_guest': frame['repeated_guest'].fillna(False).astype(int),
+            'no_of_previous_cancellations': frame['no_of_previous_cancellations'].fillna(0),
+            'no_of_previous_bookings_not_cancelled': frame['no_of_previous_bookings_not_cancelled'].fillna(0),
+            'avg_price_per_room': frame['avg_price_per_room'],
+            'no_of_special_requests': frame['no_of_special_requests'].fillna(0),
+        })
+        
+        # Calculate derived features
+        encoded['no_of_individuals'] = encoded['no_of_adults'] + encoded['no_of_children']
+        encoded['no_of_days_booked'] = encoded['no_of_weekend_nights'] + encoded['no_of_week_nights']
+        
+        return encoded[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    
+    def predict_batch(self, frame: pd.DataFrame) -> np.ndarray:
+        """Return cancellation probabilities for a batch of bookings"""
+        model, scaler, _ = self._artifacts
+        if model is None or scaler is None:
+            return np.full(len(frame), 0.5)
+        
+        if len(frame) == 0:
+            return np.empty(0)
+        
+        with INFERENCE_STAGE_LATENCY.labels("encode").time():
+            features = self.prepare_feature_matrix(frame)
+        with INFERENCE_STAGE_LATENCY.labels("scale").time():
+            scaled_features = scaler.transform(features)
+        with INFERENCE_STAGE_LATENCY.labels("predict").time():
+            probabilities = model.predict_proba(scaled_features)
+        INFERENCE_ROWS.labels("batch").inc(len(frame))
+        
+        # Class 0 = canceled, same as the single-row path
+        return probabilities[:, 0]
+    
     def predict(self, request: PredictionRequest) -> PredictionResponse:
         """Make prediction for cancellation"""
-        if self.model is None or self.scaler is None:
+        model, scaler, _ = self._artifacts
+        if model is None or scaler is None:
             return PredictionResponse(
                 will_cancel=False,
                 cancellation_probability=0.5,
@@ -92,26 +250,25 @@ class MLPredictor:
         
         try:
             # Prepare features
-            features = self.prepare_features(request)
+            with INFERENCE_STAGE_LATENCY.labels("encode").time():
+                features = self.prepare_features(request)
             
             # Scale features
-            scaled_features = self.scaler.transform(np.array([features]))
+            with INFERENCE_STAGE_LATENCY.labels("scale").time():
+                scaled_features = scaler.transform(np.array([features]))
             
             # Make prediction
-            prediction = self.model.predict(scaled_features)[0]
-            probability = self.model.predict_proba(scaled_features)[0]
+            with INFERENCE_STAGE_LATENCY.labels("predict").time():
+                prediction = model.predict(scaled_features)[0]
+                probability = model.predict_proba(scaled_features)[0]
+            INFERENCE_ROWS.labels("single").inc()
             
             # Extract cancellation probability (class 0 = canceled, class 1 = not canceled)
             cancellation_prob = probability[0] if prediction == 0 else 1 - probability[1]
             will_cancel = prediction == 0
             
             # Determine risk level
-            if cancellation_prob >= 0.7:
-                risk_level = "High"
-            elif cancellation_prob >= 0.4:
-                risk_level = "Medium"
-            else:
-                risk_level = "Low"
+            risk_level = risk_level_for(cancellation_prob)
             
             return PredictionResponse(
                 will_cancel=will_cancel,
@@ -121,6 +278,7 @@ class MLPredictor:
             
         except Exception as e:
             print(f"Prediction error: {e}")
+            MODEL_ERRORS.labels("predict").inc()
             return PredictionResponse(
                 will_cancel=False,
                 cancellation_probability=0.5,
@@ -129,3 +287,27 @@ class MLPredictor:
 
 # Global predictor instance
 predictor = MLPredictor()
+
+def _watch_models(stop_event: threading.Event, interval: int):
+    """Pick up newly published models every `interval` seconds until stopped"""
+    while not stop_event.wait(interval):
+        try:
+            predictor.reload_if_changed()
+        except Exception as e:
+            print(f"Model reload error: {e}")
+
+_stop_event = threading.Event()
+
+def start_model_watcher(interval: int = MODEL_RELOAD_INTERVAL_SECONDS) -> Optional[threading.Thread]:
+    """Start the thread that reloads the model when a new version is published (disabled when interval is 0)"""
+    if interval <= 0:
+        return None
+    
+    _stop_event.clear()
+    thread = threading.Thread(target=_watch_models, args=(_stop_event, interval), daemon=True, name="model-watcher")
+    thread.start()
+    return thread
+
+def stop_model_watcher():
+    """Signal the model reload thread to stop"""
+    _stop_event.set()
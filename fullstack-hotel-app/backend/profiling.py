@@ -0,0 +1,188 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Iterable, Optional, Set
+
+from metrics import RequestContext, add_query_listener
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 100))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", 200))
+
+MAX_SAMPLE_SECONDS = 60
+MAX_ROUTE_PROFILE_SECONDS = 600
+
+def _frame_label(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+def _collapse(frame) -> tuple:
+    """Return the stack of a frame as (labels root-first, code objects)"""
+    labels = []
+    codes = set()
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        codes.add(frame.f_code)
+        frame = frame.f_back
+    labels.reverse()
+    return labels, codes
+
+class StackSampler:
+    """Periodically samples the Python stacks of all threads"""
+
+    def __init__(self, interval: float = 0.005, target_codes: Optional[Set] = None, max_seconds: Optional[float] = None):
+        self.interval = interval
+        self.target_codes = target_codes
+        self.max_seconds = max_seconds
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample_once(self, own_ident: int):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            labels, codes = _collapse(frame)
+            # Only keep threads executing one of the target functions
+            if self.target_codes is not None and self.target_codes.isdisjoint(codes):
+                continue
+            thread_name = names.get(ident, str(ident)).replace(";", "_")
+            self.stacks[";".join([thread_name] + labels)] += 1
+        self.samples += 1
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        started_at = time.monotonic()
+        while not self._stop.wait(self.interval):
+            self._sample_once(own_ident)
+            if self.max_seconds is not None and time.monotonic() - started_at > self.max_seconds:
+                break
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name="stack-sampler")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        """Render samples in collapsed-stack format (input for flamegraph.pl / speedscope)"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+def sample_for(seconds: float, interval: float = 0.005) -> StackSampler:
+    """Sample all threads for a number of seconds"""
+    sampler = StackSampler(interval=interval)
+    sampler.start()
+    time.sleep(min(seconds, MAX_SAMPLE_SECONDS))
+    sampler.stop()
+    return sampler
+
+def _dependant_codes(dependant) -> Iterable:
+    """Collect code objects of a route endpoint and its dependencies"""
+    call = getattr(dependant, "call", None)
+    code = getattr(call, "__code__", None)
+    if code is not None:
+        yield code
+    for sub_dependant in getattr(dependant, "dependencies", []):
+        yield from _dependant_codes(sub_dependant)
+
+class RouteProfile:
+    """Samples the threads serving a route until N requests have completed"""
+
+    def __init__(self, route, requests: int, interval: float, max_seconds: float):
+        self.route = route.path
+        self.methods = route.methods
+        self.requested = requests
+        self.completed = 0
+        self.finished = False
+        self.sampler = StackSampler(
+            interval=interval,
+            target_codes=set(_dependant_codes(route.dependant)),
+            max_seconds=min(max_seconds, MAX_ROUTE_PROFILE_SECONDS),
+        )
+        self.sampler.start()
+
+    def record(self, route_path: str, method: str):
+        if self.finished:
+            return
+        if route_path == self.route and method in self.methods:
+            self.completed += 1
+        # Stop once enough requests completed or the sampler hit its time limit
+        if self.completed >= self.requested or not self.sampler.running:
+            self.finish()
+
+    def finish(self):
+        if not self.finished:
+            self.finished = True
+            self.sampler.stop()
+
+    def status(self) -> dict:
+        if not self.sampler.running:
+            self.finish()
+        return {
+            "route": self.route,
+            "requested_requests": self.requested,
+            "completed_requests": self.completed,
+            "finished": self.finished,
+            "samples": self.sampler.samples,
+            "collapsed": self.sampler.collapsed() if self.finished else None,
+        }
+
+_route_profile: Optional[RouteProfile] = None
+_route_profile_lock = threading.Lock()
+
+def start_route_profile(route, requests: int, interval: float = 0.005, max_seconds: float = 300) -> RouteProfile:
+    """Arm a profile for the next N requests to a route, replacing any previous one"""
+    global _route_profile
+    with _route_profile_lock:
+        if _route_profile is not None:
+            _route_profile.finish()
+        _route_profile = RouteProfile(route, requests, interval, max_seconds)
+        return _route_profile
+
+def current_route_profile() -> Optional[RouteProfile]:
+    return _route_profile
+
+class ProfilingMiddleware:
+    """ASGI middleware counting completed requests for an armed route profile"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profile = _route_profile
+            if profile is not None and not profile.finished and scope["type"] == "http":
+                route = scope.get("route")
+                profile.record(route.path if route is not None else "", scope["method"])
+
+# Slow query log
+slow_queries: deque = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+
+def _record_slow_query(statement: str, elapsed: float, context: Optional[RequestContext]):
+    duration_ms = elapsed * 1000
+    if duration_ms < SLOW_QUERY_MS:
+        return
+    slow_queries.append({
+        "timestamp": datetime.utcnow().isoformat(),
+        "duration_ms": round(duration_ms, 3),
+        "route": context.route if context is not None else None,
+        "method": context.scope.get("method") if context is not None else None,
+        "statement": " ".join(statement.split())[:2000],
+    })
+
+# Disabled profiling adds nothing to each query
+if PROFILING_ENABLED:
+    add_query_listener(_record_slow_query)
@@ -0,0 +1,250 @@
+import ipaddress
+import itertools
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from anyio import to_thread
+from fastapi import HTTPException, Request, status
+from sqlalchemy import case, delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from auth import verify_token
+from database import engine, RateLimitBucket
+from metrics import RATE_LIMIT_REJECTIONS, ADMISSION_IN_FLIGHT
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100_000))
+# The database backend deletes idle buckets once every this many takes
+RATE_LIMIT_PURGE_EVERY = int(os.getenv("RATE_LIMIT_PURGE_EVERY", 1000))
+# Reverse proxies (comma-separated IPs or CIDRs) whose X-Forwarded-For is believed; behind a proxy that
+# isn't listed every client shares the proxy's address, and so its anonymous (e.g. login) limits
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(proxy.strip(), strict=False)
+    for proxy in os.getenv("TRUSTED_PROXIES", "").split(",") if proxy.strip()
+]
+
+class RoutePolicy:
+    """Token bucket and concurrency cap shared by one class of routes"""
+
+    def __init__(self, name: str, per_minute: float, burst: int, concurrency: int, per_route: bool = False):
+        prefix = f"RATE_LIMIT_{name.upper()}"
+        self.name = name
+        # Give each route of the class its own bucket instead of one shared by all of them
+        self.per_route = per_route
+        per_minute = float(os.getenv(f"{prefix}_PER_MINUTE", per_minute))
+        # 0 turns the rate limit of the class off; the concurrency cap still applies
+        self.rate = per_minute / 60
+        self.burst = int(os.getenv(f"{prefix}_BURST", burst))
+        self.concurrency = int(os.getenv(f"{prefix}_CONCURRENCY", concurrency))
+        self.in_flight = 0
+
+        if per_minute < 0:
+            raise ValueError(f"{prefix}_PER_MINUTE must be 0 (no rate limit) or more, got {per_minute}")
+        if self.rate > 0 and self.burst < 1:
+            raise ValueError(f"{prefix}_BURST must be at least 1, got {self.burst}")
+        if self.concurrency < 1:
+            raise ValueError(f"{prefix}_CONCURRENCY must be at least 1, got {self.concurrency}")
+
+# Caps stay well under the default threadpool of 40 so one class cannot take it over
+POLICIES: Dict[str, RoutePolicy] = {
+    # bcrypt hashing on login and register
+    "auth": RoutePolicy("auth", per_minute=10, burst=5, concurrency=4),
+    # Single-booking model predictions
+    "inference": RoutePolicy("inference", per_minute=60, burst=20, concurrency=4),
+    # Full-table maintenance (predict-all, rescoring, archiving): each route has its own budget,
+    # but they share one concurrency slot since they all write to the bookings table
+    "admin_bulk": RoutePolicy("admin_bulk", per_minute=2, burst=2, concurrency=1, per_route=True),
+    # Lists and analytics
+    "reads": RoutePolicy("reads", per_minute=300, burst=60, concurrency=16),
+}
+
+class RateLimitBackend:
+    """Storage for token buckets; implement take() to share state across processes"""
+
+    # take() does I/O, so it is run in a worker thread instead of on the event loop
+    blocking = False
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        """Take one token and return 0, or return the seconds until one is available"""
+        raise NotImplementedError
+
+class InMemoryBackend(RateLimitBackend):
+    """Token buckets held in this process, evicting the least recently used keys"""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(burst), now]
+                if len(self._buckets) > self.max_keys:
+                    # An evicted key simply starts again with a full bucket
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / rate
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+class DatabaseBackend(RateLimitBackend):
+    """Token buckets in the rate_limit_buckets table, so every worker on the database shares them"""
+
+    blocking = True
+
+    def __init__(self, bind=engine, purge_every: int = RATE_LIMIT_PURGE_EVERY):
+        self.bind = bind
+        self.purge_every = purge_every
+        # A bucket left alone this long has refilled, which is the same as having none
+        self.idle_seconds = max((policy.burst / policy.rate for policy in POLICIES.values() if policy.rate > 0), default=0)
+        self._takes = itertools.count(1)
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        if self.purge_every > 0 and next(self._takes) % self.purge_every == 0:
+            self.purge()
+
+        table = RateLimitBucket.__table__
+        while True:
+            now = time.time()
+            refilled = table.c.tokens + (now - table.c.updated_at) * rate
+            refilled = case((refilled > burst, float(burst)), else_=refilled)
+            with self.bind.begin() as connection:
+                # A single conditional UPDATE, so two workers can't both spend the last token
+                taken = connection.execute(
+                    update(table).where(table.c.key == key, refilled >= 1).values(tokens=refilled - 1, updated_at=now)
+                ).rowcount
+                if taken:
+                    return 0.0
+                row = connection.execute(select(table.c.tokens, table.c.updated_at).where(table.c.key == key)).first()
+
+            if row is None:
+                try:
+                    with self.bind.begin() as connection:
+                        connection.execute(insert(table).values(key=key, tokens=burst - 1, updated_at=now))
+                    return 0.0
+                except IntegrityError:
+                    # Another worker created the bucket first: take from it
+                    continue
+
+            wait = (1 - min(burst, row.tokens + (now - row.updated_at) * rate)) / rate
+            # Otherwise a token came in between the UPDATE and the SELECT: try again
+            if wait > 0:
+                return wait
+
+    def purge(self) -> int:
+        """Delete buckets that have been idle long enough to be full again"""
+        table = RateLimitBucket.__table__
+        with self.bind.begin() as connection:
+            return connection.execute(delete(table).where(table.c.updated_at < time.time() - self.idle_seconds)).rowcount
+
+    def reset(self):
+        with self.bind.begin() as connection:
+            connection.execute(delete(RateLimitBucket.__table__))
+
+backend: RateLimitBackend = InMemoryBackend()
+
+def set_backend(new_backend: RateLimitBackend):
+    """Replace the token bucket storage, e.g. with a shared store"""
+    global backend
+    backend = new_backend
+
+def _is_trusted_proxy(host: str) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in TRUSTED_PROXIES)
+
+def client_ip(request: Request) -> str:
+    """Address of the client, taken from X-Forwarded-For when the request came through a trusted proxy"""
+    host = request.client.host if request.client else "unknown"
+    if not TRUSTED_PROXIES or not _is_trusted_proxy(host):
+        return host
+    # Each proxy appends the address it received from; walk back past our own proxies
+    hops = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+    for hop in reversed(hops):
+        host = hop
+        if not _is_trusted_proxy(hop):
+            break
+    return host
+
+def client_key(request: Request) -> str:
+    """Key requests by the user in a valid bearer token, falling back to the client IP"""
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        # Only the signature is checked; the route's own auth dependency loads the user
+        email = verify_token(token)
+        if email is not None:
+            return f"user:{email}"
+    return f"ip:{client_ip(request)}"
+
+def _reject(policy: RoutePolicy, reason: str, status_code: int, retry_after: float, detail: str):
+    RATE_LIMIT_REJECTIONS.labels(policy.name, reason).inc()
+    raise HTTPException(
+        status_code=status_code,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+async def _check_rate(policy: RoutePolicy, request: Request):
+    bucket = policy.name
+    if policy.per_route:
+        route = request.scope.get("route")
+        bucket = f"{bucket}:{route.path if route is not None else request.url.path}"
+    key = f"{bucket}:{client_key(request)}"
+    if backend.blocking:
+        wait = await to_thread.run_sync(backend.take, key, policy.rate, policy.burst)
+    else:
+        wait = backend.take(key, policy.rate, policy.burst)
+    if wait > 0:
+        _reject(policy, "rate", status.HTTP_429_TOO_MANY_REQUESTS, wait, "Too many requests")
+
+_dependencies = {}
+
+def rate_limit(route_class: str):
+    """Dependency applying the rate limit and concurrency cap of a route class"""
+    if route_class in _dependencies:
+        return _dependencies[route_class]
+
+    policy = POLICIES[route_class]
+
+    # Runs on the event loop, so in_flight needs no lock and over-cap requests never wait for a thread;
+    # the concurrency cap is per worker, since it protects that worker's threadpool
+    async def dependency(request: Request):
+        if not RATE_LIMIT_ENABLED:
+            yield
+            return
+
+        if policy.in_flight >= policy.concurrency:
+            _reject(policy, "concurrency", status.HTTP_503_SERVICE_UNAVAILABLE, 1, "Server busy, please retry")
+
+        # Hold the slot from here: a blocking backend awaits, and other requests run meanwhile
+        policy.in_flight += 1
+        ADMISSION_IN_FLIGHT.labels(policy.name).inc()
+        try:
+            if policy.rate > 0:
+                await _check_rate(policy, request)
+            yield
+        finally:
+            policy.in_flight -= 1
+            ADMISSION_IN_FLIGHT.labels(policy.name).dec()
+
+    _dependencies[route_class] = dependency
+    return dependency
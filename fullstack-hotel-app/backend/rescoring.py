@@ -0,0 +1,194 @@
+import os
+import threading
+from datetime import date, timedelta
+from typing import Iterator, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, Booking
+from archive import ARRIVAL_KEY
+from ml_model import predictor
+from events import publish_predictions
+from explanations import explanation_updates
+
+# Upper edges (in days) of the lead-time buckets; a booking is only rescored
+# when its current lead time falls into a different bucket than last time
+LEAD_TIME_BUCKET_EDGES = [0, 3, 7, 14, 30, 60, 90, 180, 365]
+
+RESCORE_INTERVAL_SECONDS = int(os.getenv("RESCORE_INTERVAL_SECONDS", 0))
+# Bookings read, scored and committed per batch by bulk scoring
+PREDICTION_BATCH_SIZE = int(os.getenv("PREDICTION_BATCH_SIZE", 1000))
+
+# Columns needed to rebuild the feature vector of a booking
+FEATURE_SOURCE_COLUMNS = [
+    Booking.id,
+    Booking.booking_date,
+    Booking.no_of_adults,
+    Booking.no_of_children,
+    Booking.no_of_weekend_nights,
+    Booking.no_of_week_nights,
+    Booking.type_of_meal_plan,
+    Booking.required_car_parking_space,
+    Booking.room_type_reserved,
+    Booking.lead_time,
+    Booking.lead_time_bucket,
+    Booking.arrival_year,
+    Booking.arrival_month,
+    Booking.arrival_date,
+    Booking.market_segment_type,
+    Booking.repeated_guest,
+    Booking.no_of_previous_cancellations,
+    Booking.no_of_previous_bookings_not_cancelled,
+    Booking.avg_price_per_room,
+    Booking.no_of_special_requests,
+]
+
+def lead_time_bucket(lead_time):
+    """Return the bucket index for a lead time (scalar or array)"""
+    return np.searchsorted(LEAD_TIME_BUCKET_EDGES, lead_time, side="left")
+
+def current_lead_times(frame: pd.DataFrame, today: date) -> pd.Series:
+    """Derive the lead time as of `today` from booking_date and the arrival date"""
+    arrival = pd.to_datetime(
+        pd.DataFrame({
+            "year": frame["arrival_year"],
+            "month": frame["arrival_month"],
+            "day": frame["arrival_date"],
+        }),
+        errors="coerce",
+    )
+    # Lead time is counted from the later of the booking date and today
+    reference = pd.to_datetime(frame["booking_date"], errors="coerce").fillna(pd.Timestamp(today))
+    reference = reference.where(reference > pd.Timestamp(today), pd.Timestamp(today))
+    
+    lead_times = (arrival - reference).dt.days.clip(lower=0)
+    
+    # Keep the stored value when the arrival date is invalid
+    return lead_times.fillna(frame["lead_time"].fillna(0)).astype(int)
+
+def _date_key(day: date) -> int:
+    return day.year * 10000 + day.month * 100 + day.day
+
+def bucket_changed_criteria(today: date):
+    """SQL condition matching bookings whose lead-time bucket as of `today` differs from the stored one"""
+    # Counted from today, bucket b holds arrivals in (today + edges[b - 1], today + edges[b]]
+    keys = [_date_key(today + timedelta(days=edge)) for edge in LEAD_TIME_BUCKET_EDGES]
+    arrival_ranges = (
+        [ARRIVAL_KEY <= keys[0]]
+        + [and_(ARRIVAL_KEY > low, ARRIVAL_KEY <= high) for low, high in zip(keys, keys[1:])]
+        + [ARRIVAL_KEY > keys[-1]]
+    )
+    unchanged = or_(*(
+        and_(Booking.lead_time_bucket == bucket, arrival_range) for bucket, arrival_range in enumerate(arrival_ranges)
+    ))
+    # Lead time is counted from a booking date still ahead, so it doesn't move with today
+    booked_ahead = and_(Booking.booking_date.isnot(None), Booking.booking_date > today)
+    return or_(Booking.lead_time_bucket.is_(None), and_(~unchanged, ~booked_ahead))
+
+def iter_booking_frames(db: Session, *criteria, batch_size: int = PREDICTION_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+    """Yield matching bookings' feature columns and current score in id order, one bounded batch at a time"""
+    columns = FEATURE_SOURCE_COLUMNS + [Booking.cancellation_prediction]
+    last_id = 0
+    # Keyset pages rather than one open cursor: each batch commits, which ends the cursor's transaction
+    while True:
+        rows = db.execute(
+            select(*columns).where(Booking.id > last_id, *criteria).order_by(Booking.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield pd.DataFrame(rows, columns=[column.key for column in columns])
+
+def store_predictions(db: Session, frame: pd.DataFrame, probabilities: np.ndarray, extra_columns: Sequence[str] = ()):
+    """Write a batch of scores (plus explanations for High-risk rows), commit, and publish the changes"""
+    explanations, version = explanation_updates(frame, probabilities)
+    extras = frame[list(extra_columns)].to_dict("records") if extra_columns else [{}] * len(frame)
+    db.execute(
+        update(Booking),
+        [
+            {
+                "id": int(booking_id),
+                "cancellation_prediction": float(probability),
+                "prediction_status": "scored",
+                "prediction_explanation": explanation,
+                "explanation_version": version if explanation is not None else None,
+                **extra,
+            }
+            for booking_id, probability, explanation, extra in zip(frame["id"], probabilities, explanations, extras)
+        ],
+    )
+    db.commit()
+    # Nothing from this batch needs to stay in the identity map
+    db.expunge_all()
+    publish_predictions(frame["id"], frame["cancellation_prediction"], probabilities)
+
+def score_bookings(db: Session, *criteria, batch_size: int = PREDICTION_BATCH_SIZE) -> int:
+    """Score matching bookings batch by batch; returns how many were scored"""
+    scored = 0
+    for frame in iter_booking_frames(db, *criteria, batch_size=batch_size):
+        store_predictions(db, frame, predictor.predict_batch(frame))
+        scored += len(frame)
+    return scored
+
+def rescore_active_bookings(db: Session, today: Optional[date] = None, force: bool = False,
+                            batch_size: int = PREDICTION_BATCH_SIZE) -> dict:
+    """Recompute lead times and rescore active bookings whose lead-time bucket changed"""
+    today = today or date.today()
+    
+    # Without a model every score would be the 0.5 placeholder
+    if predictor.model is None or predictor.scaler is None:
+        return {"active_bookings": 0, "rescored_bookings": 0}
+    
+    active_criteria = (Booking.status == "Active",)
+    active = db.execute(select(func.count()).select_from(Booking).where(*active_criteria)).scalar()
+    # Only rows whose bucket moved are read; the rest of the table stays in the database
+    criteria = active_criteria if force else active_criteria + (bucket_changed_criteria(today),)
+    
+    rescored = 0
+    for frame in iter_booking_frames(db, *criteria, batch_size=batch_size):
+        frame["lead_time"] = current_lead_times(frame, today)
+        buckets = lead_time_bucket(frame["lead_time"].to_numpy())
+        
+        if force:
+            changed = np.ones(len(frame), dtype=bool)
+        else:
+            changed = frame["lead_time_bucket"].isna().to_numpy() | (frame["lead_time_bucket"].to_numpy() != buckets)
+        
+        stale = frame[changed].assign(lead_time_bucket=buckets[changed])
+        if not stale.empty:
+            store_predictions(db, stale, predictor.predict_batch(stale), extra_columns=("lead_time", "lead_time_bucket"))
+            rescored += len(stale)
+    
+    return {"active_bookings": active, "rescored_bookings": rescored}
+
+def _rescore_loop(stop_event: threading.Event, interval: int):
+    """Run rescoring every `interval` seconds until stopped"""
+    while not stop_event.wait(interval):
+        db = SessionLocal()
+        try:
+            result = rescore_active_bookings(db)
+            print(f"Scheduled rescoring: {result['rescored_bookings']} of {result['active_bookings']} active bookings rescored")
+        except Exception as e:
+            print(f"Scheduled rescoring error: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+_stop_event = threading.Event()
+
+def start_rescore_scheduler(interval: int = RESCORE_INTERVAL_SECONDS) -> Optional[threading.Thread]:
+    """Start the background rescoring thread (disabled when interval is 0)"""
+    if interval <= 0:
+        return None
+    
+    _stop_event.clear()
+    thread = threading.Thread(target=_rescore_loop, args=(_stop_event, interval), daemon=True, name="rescore-scheduler")
+    thread.start()
+    return thread
+
+def stop_rescore_scheduler():
+    """Signal the background rescoring thread to stop"""
+    _stop_event.set()
@@ -0,0 +1,226 @@
+import argparse
+import json
+import os
+import pickle
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, log_loss, roc_auc_score
+from sklearn.model_selection import TimeSeriesSplit
+from sklearn.preprocessing import StandardScaler
+
+from database import SessionLocal
+from ml_model import MODELS_DIR, artifact_version, predictor
+from snapshot_export import export_snapshot, load_snapshot
+
+RETRAIN_HOLDOUT_FRACTION = float(os.getenv("RETRAIN_HOLDOUT_FRACTION", 0.2))
+RETRAIN_CV_FOLDS = int(os.getenv("RETRAIN_CV_FOLDS", 5))
+RETRAIN_N_JOBS = int(os.getenv("RETRAIN_N_JOBS", -1))
+RETRAIN_MAX_SECONDS = float(os.getenv("RETRAIN_MAX_SECONDS", 1800))
+RETRAIN_MAX_MEMORY_MB = float(os.getenv("RETRAIN_MAX_MEMORY_MB", 4096))
+
+# Depth and leaf size keep the pickled forest small enough for every worker to load
+MODEL_PARAMS = {
+    "n_estimators": 200,
+    "max_depth": 16,
+    "min_samples_leaf": 5,
+    "class_weight": "balanced",
+    "random_state": 42,
+}
+
+def _peak_rss_mb(who: int) -> float:
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def fit_model(features: np.ndarray, labels: np.ndarray, n_jobs: int = RETRAIN_N_JOBS, params: Optional[dict] = None):
+    """Fit the scaler and classifier on one training set"""
+    scaler = StandardScaler().fit(features)
+    model = RandomForestClassifier(n_jobs=n_jobs, **(params or MODEL_PARAMS))
+    model.fit(scaler.transform(features), labels)
+    return model, scaler
+
+def evaluate(model, scaler, features: np.ndarray, labels: np.ndarray) -> Dict[str, float]:
+    """Score a model on held-out rows; the positive class is 0 (canceled), as in MLPredictor"""
+    probabilities = model.predict_proba(scaler.transform(features))
+    cancel_probability = probabilities[:, list(model.classes_).index(0)]
+    canceled = labels == 0
+    return {
+        "roc_auc": round(float(roc_auc_score(canceled, cancel_probability)), 4) if 0 < canceled.sum() < len(canceled) else None,
+        "log_loss": round(float(log_loss(canceled, cancel_probability, labels=[False, True])), 4),
+        "accuracy": round(float(accuracy_score(canceled, cancel_probability >= 0.5)), 4),
+    }
+
+def _cross_validation_fold(snapshot_path: str, train_rows: np.ndarray, test_rows: np.ndarray, params: dict) -> Dict[str, float]:
+    # Each worker maps the snapshot itself instead of receiving the feature matrix through a pipe
+    snapshot = load_snapshot(snapshot_path)
+    model, scaler = fit_model(snapshot.features(rows=train_rows), snapshot.labels[train_rows], n_jobs=1, params=params)
+    return evaluate(model, scaler, snapshot.features(rows=test_rows), snapshot.labels[test_rows])
+
+def cross_validate(snapshot_path: str, rows: np.ndarray, folds: int = RETRAIN_CV_FOLDS, params: Optional[dict] = None) -> dict:
+    """Forward-chaining cross-validation over time-ordered rows, one process per fold"""
+    splits = [(rows[train], rows[test]) for train, test in TimeSeriesSplit(n_splits=folds).split(rows)]
+    workers = min(folds, os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(
+            _cross_validation_fold,
+            [snapshot_path] * folds,
+            [train for train, _ in splits],
+            [test for _, test in splits],
+            [params or MODEL_PARAMS] * folds,
+        ))
+    aucs = [result["roc_auc"] for result in results if result["roc_auc"] is not None]
+    return {
+        "folds": results,
+        "mean_roc_auc": round(float(np.mean(aucs)), 4) if aucs else None,
+        "std_roc_auc": round(float(np.std(aucs)), 4) if aucs else None,
+    }
+
+def time_split(snapshot, holdout_fraction: float = RETRAIN_HOLDOUT_FRACTION):
+    """Split row indices by arrival date: the latest arrivals form the holdout"""
+    order = np.argsort(snapshot.columns["arrival_key"], kind="stable")
+    cut = int(len(order) * (1 - holdout_fraction))
+    return order[:cut], order[cut:]
+
+def publish(model, scaler, metadata: dict, models_dir: str = MODELS_DIR) -> str:
+    """Write a versioned artifact directory and point CURRENT at it"""
+    os.makedirs(models_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".staging-", dir=models_dir)
+    try:
+        model_path = os.path.join(staging, "model.pkl")
+        scaler_path = os.path.join(staging, "scaler.pkl")
+        with open(model_path, "wb") as f:
+            pickle.dump(model, f)
+        with open(scaler_path, "wb") as f:
+            pickle.dump(scaler, f)
+        version = artifact_version(model_path, scaler_path)
+        with open(os.path.join(staging, "metadata.json"), "w") as f:
+            json.dump({**metadata, "version": version}, f, indent=2)
+
+        target = os.path.join(models_dir, version)
+        if os.path.exists(target):
+            shutil.rmtree(staging)
+        else:
+            os.rename(staging, target)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    # Workers poll CURRENT, so it is replaced in one step once the artifacts are in place
+    pointer = os.path.join(models_dir, "CURRENT.tmp")
+    with open(pointer, "w") as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(models_dir, "CURRENT"))
+    return version
+
+def retrain(snapshot_path: Optional[str] = None, folds: int = RETRAIN_CV_FOLDS,
+            holdout_fraction: float = RETRAIN_HOLDOUT_FRACTION, min_improvement: float = 0.0,
+            force: bool = False, dry_run: bool = False, models_dir: str = MODELS_DIR) -> dict:
+    """Export (or reuse) a snapshot, cross-validate, compare with the live model and publish"""
+    started = time.perf_counter()
+    stages: Dict[str, float] = {}
+    report = {"started_at": datetime.utcnow().isoformat(), "params": MODEL_PARAMS, "stages_seconds": stages}
+    temp_dir = None
+
+    def timed(stage: str, since: float) -> float:
+        now = time.perf_counter()
+        stages[stage] = round(now - since, 3)
+        return now
+
+    try:
+        mark = time.perf_counter()
+        if snapshot_path is None:
+            temp_dir = tempfile.mkdtemp(prefix="hotel-retrain-")
+            snapshot_path = os.path.join(temp_dir, "snapshot")
+            db = SessionLocal()
+            try:
+                export_snapshot(db, snapshot_path)
+            finally:
+                db.close()
+        snapshot = load_snapshot(snapshot_path)
+        mark = timed("snapshot", mark)
+
+        train_rows, holdout_rows = time_split(snapshot, holdout_fraction)
+        if len(train_rows) < folds * 10 or len(holdout_rows) == 0:
+            raise ValueError(f"Not enough finished bookings to retrain ({len(snapshot)} rows)")
+        report["rows"] = {"train": int(len(train_rows)), "holdout": int(len(holdout_rows))}
+
+        report["cross_validation"] = cross_validate(snapshot_path, train_rows, folds)
+        mark = timed("cross_validation", mark)
+
+        model, scaler = fit_model(snapshot.features(rows=train_rows), snapshot.labels[train_rows])
+        mark = timed("fit", mark)
+
+        holdout_features = snapshot.features(rows=holdout_rows)
+        holdout_labels = snapshot.labels[holdout_rows]
+        candidate = evaluate(model, scaler, holdout_features, holdout_labels)
+        current = None
+        if predictor.model is not None and predictor.scaler is not None:
+            current = evaluate(predictor.model, predictor.scaler, holdout_features, holdout_labels)
+        report["holdout"] = {"candidate": candidate, "current": current, "current_version": predictor.version}
+        mark = timed("evaluate", mark)
+
+        better = (
+            current is None
+            or current["roc_auc"] is None
+            or (candidate["roc_auc"] is not None and candidate["roc_auc"] >= current["roc_auc"] + min_improvement)
+        )
+        report["published_version"] = None
+        if dry_run:
+            report["decision"] = "dry run"
+        elif better or force:
+            metadata = {key: report[key] for key in ("started_at", "params", "rows", "cross_validation", "holdout")}
+            metadata["snapshot"] = snapshot.manifest
+            report["published_version"] = publish(model, scaler, metadata, models_dir)
+            report["decision"] = "published" if better else "published (forced)"
+            timed("publish", mark)
+        else:
+            report["decision"] = "kept current model"
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    elapsed = time.perf_counter() - started
+    peak_mb = _peak_rss_mb(resource.RUSAGE_SELF)
+    peak_children_mb = _peak_rss_mb(resource.RUSAGE_CHILDREN)
+    report["budget"] = {
+        "wall_clock_seconds": round(elapsed, 2),
+        "max_seconds": RETRAIN_MAX_SECONDS,
+        "peak_rss_mb": round(peak_mb, 1),
+        "peak_rss_children_mb": round(peak_children_mb, 1),
+        "max_memory_mb": RETRAIN_MAX_MEMORY_MB,
+        "within_budget": elapsed <= RETRAIN_MAX_SECONDS and max(peak_mb, peak_children_mb) <= RETRAIN_MAX_MEMORY_MB,
+    }
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrain the cancellation model from collected bookings")
+    parser.add_argument("--snapshot", default=None, help="Existing snapshot directory (default: export a fresh one)")
+    parser.add_argument("--folds", type=int, default=RETRAIN_CV_FOLDS, help="Cross-validation folds, run in parallel processes")
+    parser.add_argument("--holdout", type=float, default=RETRAIN_HOLDOUT_FRACTION, help="Fraction of latest arrivals held out")
+    parser.add_argument("--min-improvement", type=float, default=0.0, help="Holdout ROC AUC gain required to publish")
+    parser.add_argument("--force", action="store_true", help="Publish even if the current model scores better")
+    parser.add_argument("--dry-run", action="store_true", help="Train and compare without publishing")
+    parser.add_argument("--report", default=None, help="Also write the run report to this JSON file")
+    args = parser.parse_args()
+
+    report = retrain(args.snapshot, folds=args.folds, holdout_fraction=args.holdout,
+                     min_improvement=args.min_improvement, force=args.force, dry_run=args.dry_run)
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    if not report["budget"]["within_budget"]:
+        print("Retraining exceeded its wall-clock or memory budget")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
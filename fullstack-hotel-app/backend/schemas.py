@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr
 from typing import Optional, List
 from datetime import datetime, date
 
@@ -99,6 +99,7 @@ class BookingInDB(BookingBase):
     no_of_individuals: int
     no_of_days_booked: int
     cancellation_prediction: Optional[float]
+    prediction_status: Optional[str] = None
     status: str
     created_at: datetime
     updated_at: datetime
@@ -135,6 +136,23 @@ class PredictionResponse(BaseModel):
     cancellation_probability: float
     risk_level: str
 
+class FeatureContribution(BaseModel):
+    feature: str
+    contribution: float
+
+class BookingExplanation(BaseModel):
+    # model_version names the ML model, not a pydantic attribute
+    model_config = ConfigDict(protected_namespaces=())
+    
+    booking_id: int
+    cancellation_prediction: Optional[float] = None
+    risk_level: str
+    model_version: Optional[str] = None
+    method: str
+    cached: bool
+    base_value: float
+    contributions: List[FeatureContribution]
+
 # Analytics schemas
 class BookingStats(BaseModel):
     total_bookings: int
@@ -0,0 +1,259 @@
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime
+from typing import Optional, Sequence
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from sqlalchemy import insert, func
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, User, Room, Booking, BookingArchive, UserBookingStats, IdempotencyKey, create_tables
+from auth import get_password_hash
+from ml_model import predictor
+from rescoring import score_bookings
+
+# Category frequencies approximated from the hotel reservations training data
+ADULTS = ([0, 1, 2, 3], [0.004, 0.212, 0.720, 0.064])
+CHILDREN = ([0, 1, 2], [0.926, 0.045, 0.029])
+WEEKEND_NIGHTS = ([0, 1, 2, 3, 4], [0.465, 0.276, 0.250, 0.005, 0.004])
+WEEK_NIGHTS = ([0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10], [0.066, 0.262, 0.315, 0.217, 0.083, 0.045, 0.005, 0.003, 0.002, 0.001, 0.001])
+MEAL_PLANS = (["Meal Plan 1", "Not Selected", "Meal Plan 2", "Meal Plan 3"], [0.767, 0.141, 0.091, 0.001])
+ROOM_TYPES = (
+    ["Room Type 1", "Room Type 2", "Room Type 3", "Room Type 4", "Room Type 5", "Room Type 6", "Room Type 7"],
+    [0.775, 0.019, 0.001, 0.167, 0.007, 0.027, 0.004],
+)
+MARKET_SEGMENTS = (["Online", "Offline", "Corporate", "Complementary", "Aviation"], [0.640, 0.290, 0.056, 0.011, 0.003])
+SPECIAL_REQUESTS = ([0, 1, 2, 3, 4], [0.545, 0.314, 0.120, 0.019, 0.002])
+# Share of arrivals per month (January first)
+ARRIVAL_MONTHS = [0.028, 0.047, 0.065, 0.075, 0.072, 0.088, 0.080, 0.105, 0.127, 0.147, 0.082, 0.083]
+
+PARKING_RATE = 0.031
+REPEATED_GUEST_RATE = 0.026
+LEAD_TIME_SHAPE = 0.9  # Gamma distribution: mean ~85 days, median ~57 days
+LEAD_TIME_SCALE = 95.0
+MAX_LEAD_TIME = 443
+
+# Room inventory and nightly base price per room type (mean prices of the training data)
+ROOM_INVENTORY = [
+    ("Room Type 1", 50, 96.0),
+    ("Room Type 2", 30, 88.0),
+    ("Room Type 3", 20, 73.0),
+    ("Room Type 4", 25, 125.0),
+    ("Room Type 5", 15, 123.0),
+    ("Room Type 6", 10, 182.0),
+    ("Room Type 7", 5, 155.0),
+]
+
+CITIES = ["New York", "Boston", "Chicago", "Los Angeles", "San Francisco", "Seattle", "Miami", "Austin", "Denver", "Atlanta"]
+
+SEED_PASSWORD = "password123"
+SEED_EMAIL_DOMAIN = "seedhotel.com"
+CHUNK_SIZE = 100_000
+
+def _choice_index(rng: np.random.Generator, distribution: tuple, size: int) -> np.ndarray:
+    """Draw indices into the values of a (values, weights) distribution"""
+    values, weights = distribution
+    weights = np.asarray(weights, dtype=float)
+    return rng.choice(len(values), size=size, p=weights / weights.sum())
+
+def _choice(rng: np.random.Generator, distribution: tuple, size: int) -> np.ndarray:
+    """Draw values from a (values, weights) distribution"""
+    values = distribution[0]
+    return np.asarray(values, dtype=object if isinstance(values[0], str) else None)[_choice_index(rng, distribution, size)]
+
+def _insert_columns(db: Session, table, columns: dict, total: int, chunk_size: int = CHUNK_SIZE):
+    """Bulk insert column arrays, committing one large transaction per chunk"""
+    names = list(columns)
+    for start in range(0, total, chunk_size):
+        stop = min(start + chunk_size, total)
+        rows = [
+            dict(zip(names, values))
+            for values in zip(*(columns[name][start:stop].tolist() for name in names))
+        ]
+        db.execute(insert(table), rows)
+        db.commit()
+
+def _set_sqlite_synchronous(db: Session, mode: str):
+    """Switch fsync behaviour of a SQLite connection (OFF while bulk loading)"""
+    if db.get_bind().dialect.name == "sqlite":
+        db.connection().exec_driver_sql(f"PRAGMA synchronous={mode}")
+
+def _next_id(db: Session, model) -> int:
+    return (db.query(func.max(model.id)).scalar() or 0) + 1
+
+def seed_users(db: Session, count: int, rng: np.random.Generator, hashed_password: Optional[str] = None,
+               email_domain: str = SEED_EMAIL_DOMAIN) -> np.ndarray:
+    """Insert synthetic guests sharing one precomputed password hash; return their ids"""
+    hashed_password = hashed_password or get_password_hash(SEED_PASSWORD)
+    first_id = _next_id(db, User)
+    ids = np.arange(first_id, first_id + count)
+    now = datetime.utcnow()
+    _insert_columns(db, User.__table__, {
+        "id": ids,
+        "email": np.array([f"guest{i}@{email_domain}" for i in ids], dtype=object),
+        "hashed_password": np.full(count, hashed_password, dtype=object),
+        "full_name": np.array([f"Guest {i}" for i in ids], dtype=object),
+        "phone": np.char.zfill(rng.integers(0, 10**10, count).astype(str), 10).astype(object),
+        "city": np.asarray(CITIES, dtype=object)[rng.integers(0, len(CITIES), count)],
+        "role": np.full(count, "USER", dtype=object),
+        "is_active": np.ones(count, dtype=bool),
+        "created_at": np.full(count, now, dtype=object),
+    }, count)
+    return ids
+
+def seed_rooms(db: Session, inventory: Sequence[tuple] = ROOM_INVENTORY) -> list:
+    """Insert the inventory's room types that don't exist yet; return (id, room_type, price) per inventory room"""
+    rooms = {room.room_type: room for room in db.query(Room)}
+    missing = [Room(room_type=room_type, total_rooms=total, available_rooms=total, price=price)
+               for room_type, total, price in inventory if room_type not in rooms]
+    db.add_all(missing)
+    db.commit()
+    rooms.update((room.room_type, room) for room in missing)
+    return [(rooms[room_type].id, room_type, rooms[room_type].price) for room_type, _, _ in inventory]
+
+def generate_bookings(count: int, user_ids: np.ndarray, rooms: list, rng: np.random.Generator,
+                      today: Optional[date] = None) -> dict:
+    """Generate booking columns following the training-data distributions"""
+    today = today or date.today()
+
+    # Map every room type to a room; types missing from the inventory use the first room
+    room_lookup = {room_type: (room_id, price) for room_id, room_type, price in rooms}
+    room_choices = [room_lookup.get(room_type, (rooms[0][0], rooms[0][2])) for room_type in ROOM_TYPES[0]]
+    room_ids = np.array([room_id for room_id, _ in room_choices])
+    room_prices = np.array([price for _, price in room_choices])
+    room_index = _choice_index(rng, ROOM_TYPES, count)
+    room_types = np.asarray(ROOM_TYPES[0], dtype=object)[room_index]
+
+    # Arrivals over the two previous years and the current one, with monthly seasonality
+    years = rng.integers(today.year - 2, today.year + 1, count)
+    months = rng.choice(12, size=count, p=np.asarray(ARRIVAL_MONTHS) / sum(ARRIVAL_MONTHS))
+    month_start = (years - 1970) * 12 + months
+    month_start = month_start.astype("datetime64[M]")
+    days_in_month = ((month_start + 1).astype("datetime64[D]") - month_start.astype("datetime64[D]")).astype(int)
+    arrival = month_start.astype("datetime64[D]") + (rng.random(count) * days_in_month).astype(int)
+
+    # A future arrival was booked at least the days still ahead of it ago, so no booking date is after today;
+    # the draw adds how far before today it was booked (the distribution is close to memoryless)
+    days_ahead = np.maximum((arrival - np.datetime64(today, "D")).astype(int), 0)
+    lead_time = np.minimum(days_ahead + rng.gamma(LEAD_TIME_SHAPE, LEAD_TIME_SCALE, count).astype(int), MAX_LEAD_TIME)
+    booking_date = arrival - lead_time.astype("timedelta64[D]")
+
+    adults = _choice(rng, ADULTS, count).astype(int)
+    children = _choice(rng, CHILDREN, count).astype(int)
+    weekend_nights = _choice(rng, WEEKEND_NIGHTS, count).astype(int)
+    week_nights = _choice(rng, WEEK_NIGHTS, count).astype(int)
+    market_segment = _choice(rng, MARKET_SEGMENTS, count)
+    special_requests = _choice(rng, SPECIAL_REQUESTS, count).astype(int)
+    repeated_guest = rng.random(count) < REPEATED_GUEST_RATE
+
+    # Prices peak in late summer and vary around the room's base price
+    season = 1 + 0.2 * np.sin((months - 4) / 12 * 2 * np.pi)
+    avg_price = np.round(room_prices[room_index] * season * rng.lognormal(0, 0.15, count), 2)
+
+    # Cancellation odds rise with lead time and online bookings, fall with special requests
+    logit = (-1.6 + 0.011 * lead_time - 0.9 * special_requests
+             + 0.6 * (market_segment == "Online") - 1.5 * repeated_guest)
+    cancelled = rng.random(count) < 1 / (1 + np.exp(-logit))
+    status = np.where(cancelled, "Cancelled", np.where(arrival < np.datetime64(today, "D"), "Completed", "Active")).astype(object)
+
+    return {
+        "user_id": user_ids[rng.integers(0, len(user_ids), count)],
+        "room_id": room_ids[room_index],
+        "booking_date": booking_date,
+        "no_of_adults": adults,
+        "no_of_children": children,
+        "no_of_weekend_nights": weekend_nights,
+        "no_of_week_nights": week_nights,
+        "type_of_meal_plan": _choice(rng, MEAL_PLANS, count),
+        "required_car_parking_space": rng.random(count) < PARKING_RATE,
+        "room_type_reserved": room_types,
+        "lead_time": lead_time,
+        "arrival_year": years,
+        "arrival_month": months + 1,
+        "arrival_date": (arrival - month_start.astype("datetime64[D]")).astype(int) + 1,
+        "market_segment_type": market_segment,
+        "repeated_guest": repeated_guest,
+        "no_of_previous_cancellations": np.where(repeated_guest, rng.poisson(0.3, count), 0),
+        "no_of_previous_bookings_not_cancelled": np.where(repeated_guest, rng.poisson(3, count), 0),
+        "avg_price_per_room": avg_price,
+        "no_of_special_requests": special_requests,
+        "no_of_individuals": adults + children,
+        "no_of_days_booked": weekend_nights + week_nights,
+        "status": status,
+    }
+
+def seed_bookings(db: Session, count: int, user_ids: np.ndarray, rooms: list, rng: np.random.Generator,
+                  today: Optional[date] = None, chunk_size: int = CHUNK_SIZE) -> int:
+    """Generate and bulk insert bookings chunk by chunk so memory stays bounded"""
+    # Explicit ids bypass AUTOINCREMENT, so also stay above archived ones
+    first_id = max(_next_id(db, Booking), _next_id(db, BookingArchive))
+    now = datetime.utcnow()
+    for start in range(0, count, chunk_size):
+        size = min(chunk_size, count - start)
+        columns = generate_bookings(size, user_ids, rooms, rng, today=today)
+        columns["id"] = np.arange(first_id + start, first_id + start + size)
+        columns["created_at"] = np.full(size, now, dtype=object)
+        columns["updated_at"] = columns["created_at"]
+        _insert_columns(db, Booking.__table__, columns, size, chunk_size)
+    return count
+
+def score_unscored_bookings(db: Session) -> int:
+    """Score active bookings that have no prediction yet, so the dashboard shows risk right away"""
+    if predictor.model is None or predictor.scaler is None:
+        return 0
+    return score_bookings(db, Booking.status == "Active", Booking.cancellation_prediction.is_(None))
+
+def reset_database(db: Session):
+    """Delete all bookings, users and rooms"""
+    db.query(Booking).delete()
+    db.query(BookingArchive).delete()
+    db.query(UserBookingStats).delete()
+    db.query(IdempotencyKey).delete()
+    db.query(User).delete()
+    db.query(Room).delete()
+    db.commit()
+
+def seed_database(db: Session, bookings: int, users: int, seed: int = 42, reset: bool = False,
+                  today: Optional[date] = None, score: bool = True) -> dict:
+    """Seed guests, rooms and bookings deterministically for a given seed"""
+    create_tables()
+    if reset:
+        reset_database(db)
+
+    rng = np.random.default_rng(seed)
+    _set_sqlite_synchronous(db, "OFF")
+    try:
+        user_ids = seed_users(db, users, rng)
+        rooms = seed_rooms(db)
+        seed_bookings(db, bookings, user_ids, rooms, rng, today=today)
+    finally:
+        _set_sqlite_synchronous(db, "FULL")
+    scored = score_unscored_bookings(db) if score else 0
+    return {"users": users, "rooms": len(rooms), "bookings": bookings, "scored_bookings": scored}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed the database with synthetic production-scale data")
+    parser.add_argument("--bookings", type=int, default=1_000_000, help="Number of bookings to generate")
+    parser.add_argument("--users", type=int, default=50_000, help="Number of guest accounts to generate")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (same seed, same data)")
+    parser.add_argument("--reset", action="store_true", help="Delete existing bookings, users and rooms first")
+    parser.add_argument("--no-score", action="store_true", help="Leave active bookings unscored (predict-all scores them later)")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        result = seed_database(db, args.bookings, args.users, seed=args.seed, reset=args.reset, score=not args.no_score)
+        elapsed = time.perf_counter() - start
+        print(f"Seeded {result['users']} users, {result['rooms']} rooms and {result['bookings']} bookings "
+              f"in {elapsed:.1f}s ({result['bookings'] / elapsed:,.0f} bookings/s), {result['scored_bookings']} active bookings scored")
+        print(f"Guest accounts use the password '{SEED_PASSWORD}'")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
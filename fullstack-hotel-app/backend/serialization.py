@@ -0,0 +1,128 @@
+import json
+import os
+from datetime import date, datetime
+from operator import itemgetter
+from typing import Callable, Dict, List, Optional, Type
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+from sqlalchemy import Table, select
+from sqlalchemy.orm import Session
+
+from database import User, Room, Booking, bookings_all
+from schemas import User as UserSchema, Room as RoomSchema, Booking as BookingSchema
+
+try:
+    import orjson
+
+    def dumps(content) -> bytes:
+        return orjson.dumps(content)
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+    def _default(value):
+        if isinstance(value, (date, datetime)):
+            return value.isoformat()
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+    def dumps(content) -> bytes:
+        return json.dumps(content, default=_default, separators=(",", ":")).encode()
+
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "true").lower() == "true"
+
+def _nested_converter(key_index: int, names: List[str], indexes: List[int]) -> Callable[[tuple], Optional[dict]]:
+    """Build a nested object from its slice of the row"""
+    values = itemgetter(*indexes)
+
+    def convert(row):
+        # An outer join without a match yields NULL for the primary key
+        if row[key_index] is None:
+            return None
+        return dict(zip(names, values(row)))
+    return convert
+
+class RowSerializer:
+    """Builds JSON-ready dicts from flat row tuples laid out like a response schema"""
+
+    def __init__(self, schema: Type[BaseModel], table: Table, nested: Optional[Dict[str, tuple]] = None):
+        nested = nested or {}
+        self.columns = []
+        names, indexes, converters = [], [], []
+
+        for name in schema.model_fields:
+            if name in nested:
+                nested_schema, nested_table = nested[name]
+                start = len(self.columns)
+                nested_names = list(nested_schema.model_fields)
+                self.columns.extend(nested_table.c[field] for field in nested_names)
+                key_index = start + nested_names.index("id")
+                converters.append((name, _nested_converter(key_index, nested_names, list(range(start, len(self.columns))))))
+            else:
+                names.append(name)
+                indexes.append(len(self.columns))
+                self.columns.append(table.c[name])
+
+        # Resolve the row layout once instead of validating each row; nested objects follow the plain fields
+        values = itemgetter(*indexes)
+
+        def to_dict(row) -> dict:
+            item = dict(zip(names, values(row)))
+            for name, convert in converters:
+                item[name] = convert(row)
+            return item
+        self.to_dict: Callable[[tuple], dict] = to_dict
+
+    def serialize(self, rows) -> List[dict]:
+        to_dict = self.to_dict
+        return [to_dict(row) for row in rows]
+
+booking_serializer = RowSerializer(
+    BookingSchema,
+    Booking.__table__,
+    nested={"user": (UserSchema, User.__table__), "room": (RoomSchema, Room.__table__)},
+)
+# Same layout read from the live and archived bookings together
+booking_history_serializer = RowSerializer(
+    BookingSchema,
+    bookings_all,
+    nested={"user": (UserSchema, User.__table__), "room": (RoomSchema, Room.__table__)},
+)
+user_serializer = RowSerializer(UserSchema, User.__table__)
+
+def _booking_rows_query(serializer: RowSerializer, table: Table, *criteria):
+    query = (
+        select(*serializer.columns)
+        .select_from(table)
+        .outerjoin(User.__table__, User.__table__.c.id == table.c.user_id)
+        .outerjoin(Room.__table__, Room.__table__.c.id == table.c.room_id)
+    )
+    return query.where(*criteria) if criteria else query
+
+def booking_rows_query(*criteria):
+    """Select booking columns with the nested user and room, as flat tuples"""
+    return _booking_rows_query(booking_serializer, Booking.__table__, *criteria)
+
+def booking_history_rows(db: Session, *criteria) -> List[dict]:
+    """Serialize live and archived bookings; criteria refer to bookings_all columns"""
+    rows = db.execute(_booking_rows_query(booking_history_serializer, bookings_all, *criteria))
+    return booking_history_serializer.serialize(rows)
+
+def serialize_booking(db: Session, booking_id: int) -> Optional[dict]:
+    """Serialize one booking the way the list endpoints do"""
+    row = db.execute(booking_rows_query(Booking.id == booking_id)).first()
+    return None if row is None else booking_serializer.to_dict(row)
+
+def json_response(content) -> Response:
+    """Return already-encoded JSON, bypassing response_model validation"""
+    return Response(content=dumps(content), media_type="application/json")
+
+def booking_list_response(db: Session, *criteria) -> Response:
+    rows = db.execute(booking_rows_query(*criteria))
+    return json_response(booking_serializer.serialize(rows))
+
+def booking_history_response(db: Session, *criteria) -> Response:
+    return json_response(booking_history_rows(db, *criteria))
+
+def user_list_response(db: Session) -> Response:
+    rows = db.execute(select(*user_serializer.columns))
+    return json_response(user_serializer.serialize(rows))
@@ -0,0 +1,120 @@
+import gc
+import math
+import os
+from typing import Optional
+
+from gunicorn.app.base import BaseApplication
+from uvicorn.workers import UvicornWorker
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", 8000))
+# 0 (the default) runs one worker per CPU available to this container
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 0))
+MAX_WORKERS = int(os.getenv("MAX_WORKERS", 0))
+# SQLAlchemy's default pool gives each worker 5 + 10 connections; more threads than that only wait for one
+DEFAULT_THREADPOOL_TOKENS = 15
+# Seconds a worker gets to finish in-flight requests on restart or shutdown
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", 30))
+WORKER_TIMEOUT = int(os.getenv("WORKER_TIMEOUT", 120))
+KEEPALIVE = int(os.getenv("KEEPALIVE", 5))
+# Recycle workers after this many requests (0 disables)
+MAX_REQUESTS = int(os.getenv("MAX_REQUESTS", 0))
+MAX_REQUESTS_JITTER = int(os.getenv("MAX_REQUESTS_JITTER", 0))
+
+def _cgroup_cpu_limit() -> Optional[float]:
+    """CPU quota of the container, if one is set"""
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1: a quota of -1 means unlimited
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        return quota / period if quota > 0 else None
+    except (OSError, ValueError):
+        return None
+
+def available_cpus() -> int:
+    """CPUs this process may actually use: the affinity mask, capped by the cgroup quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    limit = _cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, math.ceil(limit))
+    return max(1, cpus)
+
+def worker_count(cpus: int) -> int:
+    workers = WEB_CONCURRENCY or cpus
+    if MAX_WORKERS > 0:
+        workers = min(workers, MAX_WORKERS)
+    return max(1, workers)
+
+class HotelUvicornWorker(UvicornWorker):
+    # Cancel requests still open (e.g. event streams) shortly before gunicorn would kill the worker,
+    # so the shutdown handlers still run
+    CONFIG_KWARGS = {**UvicornWorker.CONFIG_KWARGS, "timeout_graceful_shutdown": max(GRACEFUL_TIMEOUT - 5, 1)}
+
+class HotelServer(BaseApplication):
+    """Gunicorn master serving an already-imported app"""
+
+    def __init__(self, app, options: dict):
+        self.application = app
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+def serve():
+    cpus = available_cpus()
+    workers = worker_count(cpus)
+    os.environ.setdefault("THREADPOOL_TOKENS", str(DEFAULT_THREADPOOL_TOKENS))
+    # The master does the table creation and seeding below; workers skip it
+    os.environ["SKIP_STARTUP_DB_INIT"] = "true"
+
+    # Imported here, after the environment is set: this loads the model in the master
+    # so every worker shares its pages copy-on-write instead of unpickling its own
+    from main import app, init_database
+    from database import engine, read_engine
+    from events import event_hub
+    from rate_limit import DatabaseBackend, set_backend
+
+    init_database()
+    if workers > 1:
+        # Rate limits and admin events go through the database so every worker sees the same ones
+        # (Idempotency-Key records always live there)
+        set_backend(DatabaseBackend())
+        event_hub.share()
+    # Connections must not be shared across fork(); each worker opens its own
+    engine.dispose()
+    read_engine.dispose()
+    # Keep the garbage collector from touching (and so copying) the preloaded objects in workers
+    gc.freeze()
+
+    print(f"Starting {workers} workers on {cpus} available CPUs, {os.environ['THREADPOOL_TOKENS']} threads each")
+    HotelServer(app, {
+        "bind": f"{HOST}:{PORT}",
+        "workers": workers,
+        "worker_class": "server.HotelUvicornWorker",
+        "preload_app": True,
+        "graceful_timeout": GRACEFUL_TIMEOUT,
+        "timeout": WORKER_TIMEOUT,
+        "keepalive": KEEPALIVE,
+        "max_requests": MAX_REQUESTS,
+        "max_requests_jitter": MAX_REQUESTS_JITTER,
+    }).run()
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,187 @@
+import argparse
+import json
+import os
+import shutil
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from numpy.lib.format import open_memmap
+from sqlalchemy import Table, func, select
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, Booking, BookingArchive
+from ml_model import predictor, FEATURE_COLUMNS, MEAL_PLAN_MAPPING, ROOM_TYPE_MAPPING, MARKET_SEGMENT_MAPPING
+
+SNAPSHOT_FORMAT_VERSION = 1
+SNAPSHOT_CHUNK_SIZE = int(os.getenv("SNAPSHOT_CHUNK_SIZE", 50_000))
+
+# Final status -> training label, matching the model's classes (0 = canceled)
+LABELS = {"Cancelled": 0, "Completed": 1}
+
+# Columns read from the database to rebuild the serving feature vector
+SOURCE_COLUMNS = [
+    "id", "booking_date", "status",
+    "no_of_adults", "no_of_children", "no_of_weekend_nights", "no_of_week_nights",
+    "type_of_meal_plan", "required_car_parking_space", "room_type_reserved", "lead_time",
+    "arrival_year", "arrival_month", "arrival_date", "market_segment_type", "repeated_guest",
+    "no_of_previous_cancellations", "no_of_previous_bookings_not_cancelled",
+    "avg_price_per_room", "no_of_special_requests",
+]
+
+# Written next to the features: row ids and arrival dates for time-based splits
+EXTRA_COLUMNS = {"booking_id": "int64", "arrival_key": "int32", "label": "int8"}
+
+def booking_lead_times(frame: pd.DataFrame) -> pd.Series:
+    """Lead time as of the booking date, which is what the model saw when the booking was scored"""
+    # Rescoring shrinks the stored lead time as arrival approaches, so it is rebuilt here
+    arrival = pd.to_datetime(
+        pd.DataFrame({"year": frame["arrival_year"], "month": frame["arrival_month"], "day": frame["arrival_date"]}),
+        errors="coerce",
+    )
+    booked = pd.to_datetime(frame["booking_date"], errors="coerce")
+    lead_times = (arrival - booked).dt.days.clip(lower=0)
+    return lead_times.fillna(frame["lead_time"].fillna(0)).astype(int)
+
+def _finished(table: Table):
+    return table.c.status.in_(list(LABELS))
+
+def _iter_chunks(db: Session, table: Table, max_id: int, chunk_size: int):
+    """Yield finished bookings of one table as DataFrames, in id order"""
+    columns = [table.c[name] for name in SOURCE_COLUMNS]
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(*columns)
+            .where(table.c.id > last_id, table.c.id <= max_id, _finished(table))
+            .order_by(table.c.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield pd.DataFrame(rows, columns=SOURCE_COLUMNS)
+
+def export_snapshot(db: Session, output: str, chunk_size: int = SNAPSHOT_CHUNK_SIZE) -> dict:
+    """Write finished live and archived bookings as one .npy file per column plus a manifest"""
+    if os.path.exists(output):
+        raise FileExistsError(f"Snapshot directory already exists: {output}")
+
+    tables = [Booking.__table__, BookingArchive.__table__]
+    # Fix the id range up front so rows created during the export are left out
+    max_id = max(db.execute(select(func.coalesce(func.max(table.c.id), 0))).scalar() for table in tables)
+    expected = sum(
+        db.execute(select(func.count()).where(table.c.id <= max_id, _finished(table))).scalar()
+        for table in tables
+    )
+
+    # Build in a temporary directory and rename, so readers never see a partial snapshot
+    staging = f"{output}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    dtypes: Dict[str, str] = {name: "float64" for name in FEATURE_COLUMNS}
+    dtypes.update(EXTRA_COLUMNS)
+    arrays = {
+        name: open_memmap(os.path.join(staging, f"{name}.npy"), mode="w+", dtype=dtype, shape=(expected,))
+        for name, dtype in dtypes.items()
+    }
+
+    written = 0
+    for table in tables:
+        for frame in _iter_chunks(db, table, max_id, chunk_size):
+            # A booking finished after the count; keep the arrays at the counted size
+            frame = frame.iloc[:expected - written]
+            if frame.empty:
+                break
+            frame["lead_time"] = booking_lead_times(frame)
+            features = predictor.prepare_feature_matrix(frame)
+
+            end = written + len(frame)
+            for index, name in enumerate(FEATURE_COLUMNS):
+                arrays[name][written:end] = features[:, index]
+            arrays["booking_id"][written:end] = frame["id"].to_numpy()
+            arrays["arrival_key"][written:end] = (
+                frame["arrival_year"] * 10000 + frame["arrival_month"] * 100 + frame["arrival_date"]
+            ).to_numpy()
+            arrays["label"][written:end] = frame["status"].map(LABELS).to_numpy()
+            written = end
+
+    for array in arrays.values():
+        array.flush()
+    del arrays
+
+    manifest = {
+        "format": "npy-columns",
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "created_at": datetime.utcnow().isoformat(),
+        "rows": written,
+        "features": FEATURE_COLUMNS,
+        "columns": {name: {"file": f"{name}.npy", "dtype": dtype} for name, dtype in dtypes.items()},
+        "label": {"column": "label", "classes": {str(value): status for status, value in LABELS.items()}},
+        "encoder": {
+            "type_of_meal_plan": MEAL_PLAN_MAPPING,
+            "room_type_reserved": ROOM_TYPE_MAPPING,
+            "market_segment_type": MARKET_SEGMENT_MAPPING,
+        },
+        "model_version": predictor.version,
+        "source": {"max_booking_id": max_id, "statuses": list(LABELS)},
+    }
+    with open(os.path.join(staging, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    os.replace(staging, output)
+    return manifest
+
+class Snapshot:
+    """A snapshot opened for reading; columns are memory-mapped, not loaded"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format version: {self.manifest.get('format_version')}")
+
+        rows = self.manifest["rows"]
+        self.columns: Dict[str, np.ndarray] = {
+            # Arrays are allocated for the counted rows; only the first `rows` were filled
+            name: np.load(os.path.join(path, spec["file"]), mmap_mode="r")[:rows]
+            for name, spec in self.manifest["columns"].items()
+        }
+
+    def __len__(self) -> int:
+        return self.manifest["rows"]
+
+    @property
+    def labels(self) -> np.ndarray:
+        return self.columns[self.manifest["label"]["column"]]
+
+    def features(self, names: Optional[List[str]] = None, rows=slice(None)) -> np.ndarray:
+        """Stack feature columns into a matrix in serving order (this copies the selected rows)"""
+        names = names or self.manifest["features"]
+        return np.column_stack([self.columns[name][rows] for name in names])
+
+def load_snapshot(path: str) -> Snapshot:
+    """Open a snapshot written by export_snapshot"""
+    return Snapshot(path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Export finished bookings as a columnar training snapshot")
+    parser.add_argument("--output", default=None, help="Snapshot directory (default: snapshots/<timestamp>)")
+    parser.add_argument("--chunk-size", type=int, default=SNAPSHOT_CHUNK_SIZE, help="Bookings read and encoded per chunk")
+    args = parser.parse_args()
+
+    output = args.output or os.path.join("snapshots", datetime.utcnow().strftime("%Y%m%d-%H%M%S"))
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+
+    db = SessionLocal()
+    try:
+        manifest = export_snapshot(db, output, chunk_size=args.chunk_size)
+        print(f"Exported {manifest['rows']} bookings to {output} (model version {manifest['model_version']})")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,33 @@ const AdminDashboard: React.FC = () => {
     loadData();
   }, []);
 
+  // Apply pushed changes instead of refetching everything
+  useEffect(() => {
+    return adminAPI.subscribeToEvents({
+      onBookingCreated: (booking) => {
+        setBookings(prev => [booking, ...prev.filter(b => b.id !== booking.id)]);
+      },
+      onBookingCancelled: ({ booking_id, status }) => {
+        setBookings(prev => prev.map(b => b.id === booking_id ? { ...b, status } : b));
+      },
+      onPredictionsUpdated: (predictions) => {
+        const updated = new Map(predictions);
+        setBookings(prev => prev.map(b => updated.has(b.id) ? { ...b, cancellation_prediction: updated.get(b.id), prediction_status: 'scored' } : b));
+      },
+      onStatsDelta: ({ stats }) => {
+        setAnalytics((prev: any) => {
+          if (!prev) return prev;
+          const next = { ...prev };
+          Object.entries(stats).forEach(([key, delta]) => {
+            next[key] = (next[key] || 0) + (delta as number);
+          });
+          return next;
+        });
+      },
+      onResync: () => loadData(),
+    });
+  }, []);
+
   // Filter and sort bookings when data or filters change
   useEffect(() => {
     let filtered = [...bookings];
@@ -348,7 +375,7 @@ const AdminDashboard: React.FC = () => {
                       <td className={`px-6 py-4 whitespace-nowrap text-sm ${getPredictionColor(booking.cancellation_prediction)}`}>
                         {booking.cancellation_prediction 
                           ? `${(booking.cancellation_prediction * 100).toFixed(1)}% - ${getRiskLevel(booking.cancellation_prediction)}`
-                          : 'Not predicted'
+                          : booking.prediction_status === 'pending' ? 'Scoring pending' : 'Not predicted'
                         }
                       </td>
                       <td className="px-6 py-4 whitespace-nowrap">
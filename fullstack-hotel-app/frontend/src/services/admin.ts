@@ -1,6 +1,9 @@
 import { api } from './api';
 import { User, Booking, BookingStats, MonthlyTrend, RoomTypeStats, PredictionRequest, PredictionResponse } from '../types';
 
+// Same as the retry interval the server sends on the stream
+const EVENT_RECONNECT_MS = 3000;
+
 export const adminAPI = {
   getAllBookings: async (): Promise<Booking[]> => {
     const response = await api.get('/admin/bookings');
@@ -41,4 +44,74 @@ export const adminAPI = {
     const response = await api.post('/admin/predict-all-bookings');
     return response.data;
   },
+
+  // Stream booking, prediction and stats changes instead of polling; returns an unsubscribe function
+  subscribeToEvents: (handlers: AdminEventHandlers): (() => void) => {
+    let source: EventSource | null = null;
+    let retryTimer: ReturnType<typeof setTimeout> | undefined;
+    let closed = false;
+    let lastEventId = '';
+
+    const reconnect = () => {
+      source?.close();
+      if (!closed) {
+        retryTimer = setTimeout(connect, EVENT_RECONNECT_MS);
+      }
+    };
+
+    const connect = async () => {
+      // EventSource cannot send an Authorization header, so it opens the stream with a short-lived ticket
+      let ticket: string;
+      try {
+        ticket = (await api.post<{ ticket: string }>('/admin/events/ticket')).data.ticket;
+      } catch {
+        reconnect();
+        return;
+      }
+      if (closed) return;
+
+      const params = new URLSearchParams({ ticket });
+      // A new EventSource doesn't send Last-Event-ID, so pass it along to replay missed events
+      if (lastEventId) params.set('last_event_id', lastEventId);
+      source = new EventSource(`${api.defaults.baseURL}/admin/events?${params}`);
+
+      const listen = <T>(type: string, handler?: (data: T) => void) => {
+        source!.addEventListener(type, (event) => {
+          const message = event as MessageEvent;
+          if (message.lastEventId) lastEventId = message.lastEventId;
+          handler?.(JSON.parse(message.data).data);
+        });
+      };
+      listen<{ booking: Booking }>('booking.created', (data) => handlers.onBookingCreated?.(data.booking));
+      listen('booking.cancelled', handlers.onBookingCancelled);
+      listen<{ predictions: [number, number][] }>('prediction.updated', (data) => handlers.onPredictionsUpdated?.(data.predictions));
+      listen('stats.delta', handlers.onStatsDelta);
+      // Sent when events were missed, e.g. after a server restart
+      listen('resync', handlers.onResync);
+
+      // The browser's own retry would reuse the expired ticket; reconnect with a fresh one instead
+      source.onerror = reconnect;
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      source?.close();
+    };
+  },
 };
+
+export interface StatsDelta {
+  stats: Partial<BookingStats>;
+  monthly_trends?: Record<string, number>;
+  room_types?: Record<string, number>;
+}
+
+export interface AdminEventHandlers {
+  onBookingCreated?: (booking: Booking) => void;
+  onBookingCancelled?: (data: { booking_id: number; status: Booking['status'] }) => void;
+  onPredictionsUpdated?: (predictions: [number, number][]) => void;
+  onStatsDelta?: (delta: StatsDelta) => void;
+  onResync?: () => void;
+}
@@ -9,8 +9,11 @@ export const roomAPI = {
 };
 
 export const bookingAPI = {
-  createBooking: async (bookingData: BookingCreate): Promise<Booking> => {
-    const response = await api.post('/bookings', bookingData);
+  // Reuse the same idempotencyKey when retrying so the booking is only created once
+  createBooking: async (bookingData: BookingCreate, idempotencyKey?: string): Promise<Booking> => {
+    const response = await api.post('/bookings', bookingData, {
+      headers: idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : undefined,
+    });
     return response.data;
   },
 
@@ -41,6 +41,7 @@ export interface Booking {
   no_of_individuals: number;
   no_of_days_booked: number;
   cancellation_prediction?: number;
+  prediction_status?: 'scored' | 'pending';
   status: 'Active' | 'Cancelled' | 'Completed';
   created_at: string;
   updated_at: string;